@@ -0,0 +1,186 @@
+import asyncio, copy, os, time, uuid
+from typing import Optional
+from dotenv import load_dotenv
+from sqlalchemy import select, text
+from sqlalchemy.engine import make_url
+from sql_models import AgentCreate
+
+load_dotenv()
+
+# safety net for a missed notification, agents are re-read at least this often
+AGENT_CACHE_TTL = float(os.getenv("AGENT_CACHE_TTL", "300"))
+# invalidate the other workers' caches through Postgres LISTEN/NOTIFY
+AGENT_CACHE_NOTIFY = os.getenv("AGENT_CACHE_NOTIFY", "false").lower() in ("1", "true", "yes")
+AGENT_CACHE_CHANNEL = os.getenv("AGENT_CACHE_CHANNEL", "agent_config")
+AGENT_CACHE_RECONNECT_SECONDS = 5
+
+
+class AgentCache:
+    """In-process cache of the agent configurations, by id and by name.
+
+    Entries are loaded lazily on the first lookup and replaced or dropped by
+    the agent handlers right after their commit (write-through). With
+    ``notify`` the handlers also NOTIFY the change in their transaction and
+    every worker LISTENs, so the other workers drop their copy too.
+
+    Lookups return a detached copy: changing it never touches the cache or
+    the database.
+    """
+
+    def __init__(self, ttl: float = AGENT_CACHE_TTL, notify: bool = AGENT_CACHE_NOTIFY,
+                 channel: str = AGENT_CACHE_CHANNEL):
+        self.ttl = ttl
+        self.notify = notify
+        self.channel = channel
+        # tags our NOTIFY payloads, the echo of our own writes is skipped
+        self.origin = uuid.uuid4().hex
+        self._agents = {}           # id -> (expires at, column values)
+        self._ids_by_name = {}
+        # bumped on every invalidation, a load that raced with one is not stored
+        self._generation = 0
+        self._subscribers = []
+        self._task = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.remote_invalidations = 0
+
+    def subscribe(self, callback):
+        """callback(agent_id) after an agent changed, here or in another worker."""
+        self._subscribers.append(callback)
+
+    def _copy(self, values: dict) -> AgentCreate:
+        return AgentCreate(**copy.deepcopy(values))
+
+    def _cached(self, agent_id: str) -> Optional[AgentCreate]:
+        entry = self._agents.get(agent_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return self._copy(entry[1])
+
+    def put(self, agent: AgentCreate):
+        self._forget(agent.id)
+        values = agent.model_dump()
+        self._agents[agent.id] = (time.monotonic() + self.ttl, values)
+        if agent.name is not None:
+            self._ids_by_name[agent.name] = agent.id
+
+    async def get(self, session, agent_id: str) -> Optional[AgentCreate]:
+        agent = self._cached(agent_id)
+        if agent is not None:
+            self.hits += 1
+            return agent
+
+        self.misses += 1
+        generation = self._generation
+        agent = await session.get(AgentCreate, agent_id)
+        if agent is None:
+            return None
+        if generation == self._generation:
+            self.put(agent)
+        return self._copy(agent.model_dump())
+
+    async def get_by_name(self, session, name: str) -> Optional[AgentCreate]:
+        agent_id = self._ids_by_name.get(name)
+        agent = self._cached(agent_id) if agent_id else None
+        if agent is not None and agent.name == name:
+            self.hits += 1
+            return agent
+
+        self.misses += 1
+        generation = self._generation
+        results = await session.execute(select(AgentCreate).where(AgentCreate.name == name))
+        agent = results.scalars().first()
+        if agent is None:
+            return None
+        if generation == self._generation:
+            self.put(agent)
+        return self._copy(agent.model_dump())
+
+    def _forget(self, agent_id: str):
+        self._agents.pop(agent_id, None)
+        for name in [name for name, cached_id in self._ids_by_name.items() if cached_id == agent_id]:
+            del self._ids_by_name[name]
+
+    def invalidate(self, agent_id: str):
+        """Drop an agent and tell the subscribers (graphs, answers built from it)."""
+        self._generation += 1
+        self._forget(agent_id)
+        self.invalidations += 1
+        for callback in self._subscribers:
+            callback(agent_id)
+
+    def changed(self, agent: AgentCreate):
+        """Write-through after a create or update was committed."""
+        self.invalidate(agent.id)
+        self.put(agent)
+
+    async def publish(self, session, *agent_ids: str):
+        """NOTIFY the other workers, delivered when the session's transaction commits."""
+        if agent_ids and self.notify and session.get_bind().dialect.name == "postgresql":
+            await session.execute(text("SELECT pg_notify(:channel, :payload)"),
+                                  [{"channel": self.channel, "payload": f"{self.origin}:{agent_id}"}
+                                   for agent_id in agent_ids])
+
+    def _on_notification(self, payload: str):
+        origin, sep, agent_id = payload.partition(":")
+        if not sep:
+            origin, agent_id = "", payload
+        if origin == self.origin:
+            # our own write, changed() already replaced the entry
+            return
+        self.remote_invalidations += 1
+        self.invalidate(agent_id)
+
+    async def _listen(self, conninfo: str):
+        import psycopg
+
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as conn:
+                    await conn.execute(f'LISTEN "{self.channel}"')
+                    print(f"📡 Listening for agent changes on '{self.channel}'.")
+                    async for notification in conn.notifies():
+                        self._on_notification(notification.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Agent cache listener failed: {e}")
+            # changes may have been missed while disconnected
+            self._generation += 1
+            self._agents.clear()
+            self._ids_by_name.clear()
+            await asyncio.sleep(AGENT_CACHE_RECONNECT_SECONDS)
+
+    async def start(self, database_url: Optional[str] = None):
+        url = make_url(database_url or os.getenv("DATABASE_URL"))
+        if not self.notify or url.get_backend_name() != "postgresql":
+            return
+        conninfo = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self._task = asyncio.create_task(self._listen(conninfo))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._agents),
+            "ttl": self.ttl,
+            "notify": self.notify,
+            "listening": self._task is not None and not self._task.done(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "remote_invalidations": self.remote_invalidations,
+        }
+
+
+agent_cache = AgentCache()
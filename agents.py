@@ -1,17 +1,26 @@
 from fastapi import APIRouter, HTTPException
-from models import Agent, AgentUpdate, AgentRead
+from models import Agent, AgentUpdate, AgentRead, AgentImport, AgentBulkRequest, AgentBulkResult
 from typing import Dict
 # from contextlib import asynccontextmanager
 from typing import Annotated
 from fastapi import HTTPException, Query
 from sqlmodel import select
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, update
+import json, os, uuid
 from typing import Dict
-from persistDB import AsyncSessionDep
+from persistDB import AsyncSessionDep, async_session
 from sql_models import AgentCreate
+from agent_cache import agent_cache
 from datetime import datetime
 
 router = APIRouter()
 
+# rows per INSERT/UPDATE statement of a bulk import, and per fetch of an export
+AGENT_BULK_BATCH_SIZE = int(os.getenv("AGENT_BULK_BATCH_SIZE", "500"))
+AGENT_BULK_MAX_ROWS = int(os.getenv("AGENT_BULK_MAX_ROWS", "5000"))
+
 example_agent = {
     "name": "medical agent",
     "description": "medical retriever agent",
@@ -20,23 +29,152 @@ example_agent = {
     "creativity": 0.1
   }
 
+def agent_columns(agent: Agent) -> dict:
+    return {
+        "name": agent.name,
+        "description": agent.description,
+        "welcomeMessage": agent.welcomeMessage,
+        "systemPrompt": agent.systemPrompt,
+        "creativity": agent.creativity,
+        "context_turns": agent.context_turns,
+        "context_summary": agent.context_summary,
+        "model_routing": agent.model_routing.model_dump(exclude_none=True),
+        "retrieval_mode": agent.retrieval_mode,
+        "relevance_grading": agent.relevance_grading,
+    }
+
+
 @router.post("/", description="To create an agent with certain features.")
 async def create_agent(agent: Agent, session: AsyncSessionDep):
 
-    agent_db = AgentCreate(
-        name=agent.name,
-        description=agent.description,
-        welcomeMessage=agent.welcomeMessage,
-        systemPrompt=agent.systemPrompt,
-        creativity=agent.creativity
-        )
+    agent_db = AgentCreate(**agent_columns(agent))
     
     session.add(agent_db)                 # ✅ not awaited
+    await agent_cache.publish(session, agent_db.id)
     await session.commit()               # ✅ awaited
     await session.refresh(agent_db)      # ✅ awaited
+    agent_cache.changed(agent_db)
     return agent_db
 
 
+_agents = AgentCreate.__table__
+
+UPDATE_AGENT = (
+    update(_agents)
+    .where(_agents.c.id == bindparam("agent_id"))
+    .values({column: bindparam(f"new_{column}") for column in _agents.c.keys() if column != "id"})
+)
+
+
+def insert_new_agents(dialect_name: str):
+    """INSERT that skips the ids created meanwhile by another request and returns the ids it wrote."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(_agents).returning(_agents.c.id)
+    return dialect_insert(_agents).on_conflict_do_nothing(index_elements=["id"]).returning(_agents.c.id)
+
+
+def bulk_result(created: list, updated: list, errors: list) -> dict:
+    return {"created": [row["id"] for row in created], "updated": [row["id"] for row in updated],
+            "errors": sorted(errors, key=lambda error: error["index"])}
+
+
+@router.post("/bulk", response_model=AgentBulkResult,
+             description="""To create (or with upsert, update) many agents in one transaction.
+                         Every row is validated on its own, invalid rows are reported
+                         by index and skipped, or with atomic nothing is written.
+                         """)
+async def bulk_import_agents(request: AgentBulkRequest, session: AsyncSessionDep):
+    if len(request.agents) > AGENT_BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {AGENT_BULK_MAX_ROWS} agents per request")
+
+    rows, errors, seen = [], [], set()
+    for index, data in enumerate(request.agents):
+        try:
+            # nulls of an export (e.g. columns added after the row) take the defaults
+            agent = AgentImport.model_validate({k: v for k, v in data.items() if v is not None})
+        except ValidationError as e:
+            errors.append({"index": index, "id": data.get("id"),
+                           "errors": [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()]})
+            continue
+        agent_id = agent.id or str(uuid.uuid4())
+        if agent_id in seen:
+            errors.append({"index": index, "id": agent_id, "errors": ["id: duplicated in this request"]})
+            continue
+        seen.add(agent_id)
+        rows.append((index, {"id": agent_id, **agent_columns(agent)}))
+
+    ids = [row["id"] for _, row in rows]
+    existing = set()
+    for start in range(0, len(ids), AGENT_BULK_BATCH_SIZE):
+        results = await session.execute(
+            select(AgentCreate.id).where(AgentCreate.id.in_(ids[start:start + AGENT_BULK_BATCH_SIZE])))
+        existing.update(results.scalars().all())
+
+    created, updated = [], []
+    for index, row in rows:
+        if row["id"] not in existing:
+            created.append((index, row))
+        elif request.upsert:
+            updated.append(row)
+        else:
+            errors.append({"index": index, "id": row["id"], "errors": ["id: agent already exists"]})
+
+    if errors and request.atomic:
+        raise HTTPException(status_code=422, detail=bulk_result([], [], errors))
+
+    # one statement per batch instead of a round trip per agent, all in one transaction
+    inserted = set()
+    statement = insert_new_agents(session.get_bind().dialect.name)
+    for start in range(0, len(created), AGENT_BULK_BATCH_SIZE):
+        results = await session.execute(statement, [row for _, row in created[start:start + AGENT_BULK_BATCH_SIZE]])
+        inserted.update(results.scalars().all())
+    # created by a concurrent import or create since the select
+    for index, row in [(index, row) for index, row in created if row["id"] not in inserted]:
+        if request.upsert:
+            updated.append(row)
+        else:
+            errors.append({"index": index, "id": row["id"], "errors": ["id: agent already exists"]})
+    created = [row for _, row in created if row["id"] in inserted]
+
+    if errors and request.atomic:
+        await session.rollback()
+        raise HTTPException(status_code=422, detail=bulk_result([], [], errors))
+
+    for start in range(0, len(updated), AGENT_BULK_BATCH_SIZE):
+        batch = updated[start:start + AGENT_BULK_BATCH_SIZE]
+        await session.execute(UPDATE_AGENT, [{"agent_id": row["id"],
+                                              **{f"new_{k}": v for k, v in row.items() if k != "id"}}
+                                             for row in batch])
+    result = bulk_result(created, updated, errors)
+    await agent_cache.publish(session, *result["updated"])
+    await session.commit()
+
+    for agent_id in result["updated"]:
+        agent_cache.invalidate(agent_id)
+    return result
+
+
+@router.get("/export", description="""To stream every agent as NDJSON, one JSON object per line.
+                                    The output can be posted back to /agents/bulk.
+                                    """)
+async def export_agents():
+    async def rows():
+        # own session: the stream outlives the request's dependencies
+        async with async_session() as session:
+            # server-side cursor, only one batch of rows is in memory at a time
+            results = await session.stream(
+                select(AgentCreate).order_by(AgentCreate.id).execution_options(yield_per=AGENT_BULK_BATCH_SIZE))
+            async for batch in results.scalars().partitions():
+                yield "".join(json.dumps(agent.model_dump(), default=str) + "\n" for agent in batch)
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": "attachment; filename=agents.ndjson"})
+
+
 @router.get("/", description="To get a list of all agents.")
 async def list_agents(
     session: AsyncSessionDep,
@@ -78,9 +216,22 @@ async def update_agent(agent_id: str, agent_update: AgentUpdate, session: AsyncS
     agent.creativity =  agent_update.creativity
     agent.systemPrompt =  agent_update.systemPrompt
     agent.welcomeMessage =  agent_update.welcomeMessage
+    if agent_update.context_turns is not None:
+        agent.context_turns = agent_update.context_turns
+    if agent_update.context_summary is not None:
+        agent.context_summary = agent_update.context_summary
+    if agent_update.model_routing is not None:
+        agent.model_routing = agent_update.model_routing.model_dump(exclude_none=True)
+    if agent_update.retrieval_mode is not None:
+        agent.retrieval_mode = agent_update.retrieval_mode
+    if agent_update.relevance_grading is not None:
+        agent.relevance_grading = agent_update.relevance_grading
 
+    await agent_cache.publish(session, agent_id)
     await session.commit()
     await session.refresh(agent)
+    # drops the compiled graphs and cached answers of the old configuration
+    agent_cache.changed(agent)
     return agent
 
 
@@ -102,8 +253,10 @@ async def delete_agent(agent_id: str, session: AsyncSessionDep):
     agent = await session.get(AgentCreate, agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Hero not found")
-    session.delete(agent)
-    session.commit()
+    await session.delete(agent)
+    await agent_cache.publish(session, agent_id)
+    await session.commit()
+    agent_cache.invalidate(agent_id)
     return {"message": f"Agent with ID: {agent_id} deleted successfully."}
 
 
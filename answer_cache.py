@@ -0,0 +1,182 @@
+import hashlib, os, re, time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from agent_cache import agent_cache
+
+load_dotenv()
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+# estimated Jaccard similarity of the question shingles for a near-duplicate hit.
+# 1 (the default) only serves identical normalized questions; near-duplicate
+# matching is opt-in, use a strict value such as 0.9 and never below 0.85
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "1"))
+
+SHINGLE_SIZE = 4
+NUM_PERM = 64
+BANDS = 16                      # LSH bands of NUM_PERM // BANDS rows each
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+
+
+def _seeded(i: int) -> int:
+    return int.from_bytes(hashlib.blake2b(f"minhash-{i}".encode(), digest_size=8).digest(), "big")
+
+
+# fixed permutations (a*x + b) mod p, the same in every process
+_PERMUTATIONS = [(_seeded(2 * i) % _PRIME | 1, _seeded(2 * i + 1) % _PRIME) for i in range(NUM_PERM)]
+
+
+def normalize(question: str) -> str:
+    """Lower case, punctuation dropped, whitespace collapsed."""
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+# words that never change what a question asks for. Single letters are not
+# here on purpose: "hepatitis A" and "hepatitis B" are different questions
+_FILLER_WORDS = {
+    "about", "an", "and", "are", "can", "could", "do", "does", "for", "how", "is", "me",
+    "of", "on", "please", "tell", "the", "to", "what", "whats", "which", "with",
+}
+
+
+def content_terms(text: str) -> frozenset:
+    """Normalized words minus filler, plural 's' dropped.
+
+    Two questions are only near-duplicates when these are equal, so questions
+    differing by one entity ("vitamin D" / "vitamin B12") never share an answer,
+    however similar their shingles are.
+    """
+    terms = set()
+    for word in text.split():
+        if word in _FILLER_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.add(word)
+    return frozenset(terms)
+
+
+def shingles(text: str) -> set:
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> tuple:
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big")
+              for s in shingles(text)]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def similarity(sig_a: tuple, sig_b: tuple) -> float:
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+def _bands(signature: tuple):
+    return [(band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+class AnswerCache:
+    """First-turn answers per agent, by normalized question, with optional
+    near-duplicate lookup (``threshold`` below 1), LRU-bounded and expiring."""
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 ttl: float = ANSWER_CACHE_TTL_SECONDS,
+                 threshold: float = ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries = OrderedDict()   # (agent_id, normalized) -> entry
+        self._buckets = {}              # (agent_id, band, rows) -> set of keys
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def _index(self, key, signature, add: bool):
+        for band, rows in _bands(signature):
+            bucket_key = (key[0], band, rows)
+            if add:
+                self._buckets.setdefault(bucket_key, set()).add(key)
+            else:
+                bucket = self._buckets.get(bucket_key)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[bucket_key]
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._index(key, entry["signature"], add=False)
+
+    def _fresh(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["created_at"] > self.ttl:
+            self._remove(key)
+            return None
+        return entry
+
+    def get(self, agent_id: str, question: str):
+        normalized = normalize(question)
+        key = (agent_id, normalized)
+
+        entry = self._fresh(key)
+        if entry is not None:
+            self.hits += 1
+        elif self.threshold < 1:
+            entry = self._nearest(agent_id, minhash(normalized), content_terms(normalized))
+            if entry is not None:
+                self.near_hits += 1
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(entry["key"])
+        return entry["answer"]
+
+    def _nearest(self, agent_id, signature, terms):
+        candidates = set()
+        for band, rows in _bands(signature):
+            candidates |= self._buckets.get((agent_id, band, rows), set())
+
+        best, best_score = None, self.threshold
+        for key in candidates:
+            entry = self._fresh(key)
+            if entry is None or entry["terms"] != terms:
+                continue
+            score = similarity(signature, entry["signature"])
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def put(self, agent_id: str, question: str, answer: str):
+        normalized = normalize(question)
+        key = (agent_id, normalized)
+        self._remove(key)
+
+        signature = minhash(normalized)
+        self._entries[key] = {"key": key, "answer": answer,
+                              "signature": signature, "terms": content_terms(normalized),
+                              "created_at": time.time()}
+        self._index(key, signature, add=True)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def evict_agent(self, agent_id: str):
+        for key in [k for k in self._entries if k[0] == agent_id]:
+            self._remove(key)
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits,
+                "near_hits": self.near_hits, "misses": self.misses}
+
+
+answer_cache = AnswerCache()
+# answers of an agent's old configuration are never served again
+agent_cache.subscribe(answer_cache.evict_agent)
@@ -0,0 +1,203 @@
+"""Offline batch evaluation of the agent graph.
+
+Runs every question of a JSONL file (one {"question": ..., "id": ...} object
+per line) through the graph of test_mcp_1.create_graph with a bounded number
+of concurrent turns, writes one result line per question and prints the
+latency percentiles and throughput.
+
+    python batch_eval.py questions.jsonl -o answers.jsonl -c 8
+
+--llm-base-url and --pubmed-url/--medrxiv-url point the run at local
+stand-in servers instead of Groq and the real MCP servers; raise --rpm and
+--tpm with them, the rate-limit scheduler otherwise paces the run like Groq.
+"""
+import argparse, asyncio, json, os, sys, time, uuid
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a JSONL file of questions through the agent graph.")
+    parser.add_argument("questions", help="JSONL file, one {\"question\": ...} object per line")
+    parser.add_argument("-o", "--output", default="batch_eval_results.jsonl", help="JSONL file for the answers")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="questions in flight at once")
+    parser.add_argument("--limit", type=int, default=None, help="only run the first N questions")
+    parser.add_argument("--system-prompt", default=None, help="system prompt of the evaluated agent")
+    parser.add_argument("--creativity", type=float, default=0.1)
+    parser.add_argument("--router-model", default=None, help="model of query_or_respond")
+    parser.add_argument("--answer-model", default=None, help="model of generate")
+    parser.add_argument("--retrieval-mode", choices=["llm", "direct"], default="llm")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds before a question counts as failed")
+    parser.add_argument("--rpm", type=int, default=None, help="requests per minute the scheduler allows (GROQ_RPM)")
+    parser.add_argument("--tpm", type=int, default=None, help="tokens per minute the scheduler allows (GROQ_TPM)")
+    parser.add_argument("--llm-base-url", default=None, help="OpenAI-compatible stand-in for the Groq API")
+    parser.add_argument("--pubmed-url", default=None, help="stand-in PubMed MCP server")
+    parser.add_argument("--medrxiv-url", default=None, help="stand-in medRxiv MCP server")
+    return parser.parse_args(argv)
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def read_questions(path: str, limit=None) -> list:
+    questions = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"question": item}
+            item.setdefault("id", str(number))
+            questions.append(item)
+            if limit and len(questions) >= limit:
+                break
+    return questions
+
+
+async def run_question(graph, item: dict, system_prompt, timeout: float) -> dict:
+    from test_mcp_1 import turn_token_usage
+
+    config = {"configurable": {"thread_id": f"eval-{uuid.uuid4()}"}}
+    if system_prompt:
+        await graph.aupdate_state(config, {"messages": [("system", system_prompt)]}, as_node="query_or_respond")
+
+    node_seconds, updates = {}, {}
+    result = {"id": item["id"], "question": item["question"], "answer": None, "error": None}
+    started = last = time.perf_counter()
+
+    async def turn():
+        nonlocal last
+        async for event in graph.astream({"messages": [("user", item["question"])]}, config):
+            now = time.perf_counter()
+            for node, update in event.items():
+                # nodes of a turn run one after the other, the gap is the node's time
+                node_seconds[node] = node_seconds.get(node, 0) + now - last
+                updates[node] = update
+            last = now
+
+    try:
+        await asyncio.wait_for(turn(), timeout)
+    except asyncio.TimeoutError:
+        result["error"] = f"timed out after {timeout:g}s"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    final = updates.get("generate") or updates.get("query_or_respond") or {}
+    messages = final.get("messages", []) if isinstance(final, dict) else []
+    if messages:
+        result["answer"] = messages[-1].content
+        if not result["error"] and messages[-1].additional_kwargs.get("error_details"):
+            result["error"] = messages[-1].additional_kwargs["error_details"]
+
+    tool_messages = (updates.get("mcp_tools") or {}).get("messages", [])
+    prompt_tokens, completion_tokens = turn_token_usage(updates)
+    result.update({
+        "latency_s": round(time.perf_counter() - started, 4),
+        "node_seconds": {node: round(seconds, 4) for node, seconds in node_seconds.items()},
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "tool_calls": len(tool_messages),
+        "tool_errors": sum(1 for m in tool_messages if getattr(m, "status", None) == "error"),
+    })
+    return result
+
+
+def summarize(results: list, wall_seconds: float) -> dict:
+    latencies = [r["latency_s"] for r in results if not r["error"]]
+    nodes = {}
+    for r in results:
+        for node, seconds in r["node_seconds"].items():
+            nodes.setdefault(node, []).append(seconds)
+    return {
+        "questions": len(results),
+        "errors": sum(1 for r in results if r["error"]),
+        "tool_errors": sum(r["tool_errors"] for r in results),
+        "wall_s": round(wall_seconds, 3),
+        "questions_per_s": round(len(results) / wall_seconds, 3) if wall_seconds else 0.0,
+        "latency_p50_s": round(percentile(latencies, 50), 3),
+        "latency_p95_s": round(percentile(latencies, 95), 3),
+        "latency_p99_s": round(percentile(latencies, 99), 3),
+        "prompt_tokens": sum(r["prompt_tokens"] for r in results),
+        "completion_tokens": sum(r["completion_tokens"] for r in results),
+        "node_p50_s": {node: round(percentile(values, 50), 3) for node, values in nodes.items()},
+        "node_p95_s": {node: round(percentile(values, 95), 3) for node, values in nodes.items()},
+    }
+
+
+def print_report(report: dict):
+    print(f"\n📊 {report['questions']} questions in {report['wall_s']}s "
+          f"({report['questions_per_s']} q/s), {report['errors']} errors, "
+          f"{report['tool_errors']} tool errors")
+    print(f"   latency p50 {report['latency_p50_s']}s  p95 {report['latency_p95_s']}s  "
+          f"p99 {report['latency_p99_s']}s")
+    print(f"   tokens: {report['prompt_tokens']} prompt, {report['completion_tokens']} completion")
+    for node, p50 in report["node_p50_s"].items():
+        print(f"   {node:<20} p50 {p50}s  p95 {report['node_p95_s'][node]}s")
+
+
+async def main(argv=None) -> dict:
+    args = parse_args(argv)
+    # the stand-ins and limits have to be configured before the graph module is imported
+    if args.llm_base_url:
+        os.environ["GROQ_API_BASE"] = args.llm_base_url
+        os.environ.setdefault("GROQ_API_KEY", "stand-in")
+    if args.rpm:
+        os.environ["GROQ_RPM"] = str(args.rpm)
+    if args.tpm:
+        os.environ["GROQ_TPM"] = str(args.tpm)
+    if args.pubmed_url:
+        os.environ["MCP_PUBMED_URL"] = args.pubmed_url
+    if args.medrxiv_url:
+        os.environ["MCP_MEDRXIV_URL"] = args.medrxiv_url
+
+    from langgraph.checkpoint.memory import MemorySaver
+    from test_mcp_1 import create_graph, load_tools, mcp_sessions
+    from model_routing import ModelRouting, NodeModel
+
+    questions = read_questions(args.questions, args.limit)
+    tools_list = await load_tools()
+    print(f"🔧 {len(tools_list)} tools, {len(questions)} questions, concurrency {args.concurrency}")
+
+    routing = ModelRouting(router=NodeModel(model=args.router_model), answer=NodeModel(model=args.answer_model))
+    graph = await create_graph(MemorySaver(), "batch-eval",
+                               creativity=args.creativity,
+                               tools_list=tools_list,
+                               routing=routing,
+                               retrieval_mode=args.retrieval_mode)
+
+    slots = asyncio.Semaphore(args.concurrency)
+    done = 0
+
+    async def bounded(item):
+        nonlocal done
+        async with slots:
+            result = await run_question(graph, item, args.system_prompt, args.timeout)
+        done += 1
+        status = "❌" if result["error"] else "✅"
+        print(f"{status} [{done}/{len(questions)}] {item['id']} {result['latency_s']}s")
+        return result
+
+    started = time.perf_counter()
+    try:
+        # results come back in question order
+        results = await asyncio.gather(*(bounded(item) for item in questions))
+    finally:
+        await mcp_sessions.close()
+    report = summarize(results, time.perf_counter() - started)
+
+    with open(args.output, "w") as f:
+        for result in results:
+            f.write(json.dumps(result, default=str) + "\n")
+    print_report(report)
+    print(f"   results written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
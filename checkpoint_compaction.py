@@ -0,0 +1,224 @@
+import asyncio, os, time
+import psycopg
+from dotenv import load_dotenv
+from sqlmodel import select
+from persistDB import async_session
+from sql_models import ConversationCreate
+
+load_dotenv()
+
+# keep this many checkpoints per thread, older ones (and their writes/blobs) go
+CHECKPOINT_KEEP_LATEST = int(os.getenv("CHECKPOINT_KEEP_LATEST", "5"))
+# threads handled per transaction, with a pause in between so live traffic isn't blocked
+CHECKPOINT_COMPACTION_BATCH = int(os.getenv("CHECKPOINT_COMPACTION_BATCH", "100"))
+CHECKPOINT_COMPACTION_PAUSE = float(os.getenv("CHECKPOINT_COMPACTION_PAUSE", "0.5"))
+# 0 disables the background job, it can still be run on demand
+CHECKPOINT_COMPACTION_INTERVAL = float(os.getenv("CHECKPOINT_COMPACTION_INTERVAL", "3600"))
+# threads written to recently are skipped: a turn may be in flight, and a new
+# conversation's checkpoint is written before its row is committed
+CHECKPOINT_COMPACTION_MIN_IDLE = float(os.getenv("CHECKPOINT_COMPACTION_MIN_IDLE", "300"))
+
+# one compaction at a time across all workers
+COMPACTION_LOCK_SQL = "select pg_try_advisory_lock(hashtext('checkpoint_compaction')) as locked"
+COMPACTION_UNLOCK_SQL = "select pg_advisory_unlock(hashtext('checkpoint_compaction'))"
+
+IDLE_THREADS_SQL = """
+select thread_id
+from checkpoints
+where thread_id > %s
+group by thread_id
+having max((checkpoint ->> 'ts')::timestamptz) < now() - make_interval(secs => %s)
+order by thread_id
+limit %s
+"""
+
+DELETE_THREADS_SQL = """
+with deleted_checkpoints as (
+    delete from checkpoints where thread_id = any(%(threads)s)
+    returning pg_column_size(checkpoints.*) as size
+), deleted_writes as (
+    delete from checkpoint_writes where thread_id = any(%(threads)s)
+    returning pg_column_size(checkpoint_writes.*) as size
+), deleted_blobs as (
+    delete from checkpoint_blobs where thread_id = any(%(threads)s)
+    returning pg_column_size(checkpoint_blobs.*) as size
+)
+select
+    (select count(*) from deleted_checkpoints) as checkpoints,
+    (select count(*) from deleted_writes) as writes,
+    (select count(*) from deleted_blobs) as blobs,
+    (select coalesce(sum(size), 0) from deleted_checkpoints)
+    + (select coalesce(sum(size), 0) from deleted_writes)
+    + (select coalesce(sum(size), 0) from deleted_blobs) as bytes
+"""
+
+DELETE_OLD_CHECKPOINTS_SQL = """
+with ranked as (
+    select thread_id, checkpoint_ns, checkpoint_id,
+           row_number() over (partition by thread_id, checkpoint_ns
+                              order by checkpoint_id desc) as rn
+    from checkpoints
+    where thread_id = any(%(threads)s)
+), deleted as (
+    delete from checkpoints c
+    using ranked r
+    where r.rn > %(keep)s
+      and c.thread_id = r.thread_id
+      and c.checkpoint_ns = r.checkpoint_ns
+      and c.checkpoint_id = r.checkpoint_id
+    returning pg_column_size(c.*) as size
+)
+select count(*) as rows, coalesce(sum(size), 0) as bytes from deleted
+"""
+
+# writes belonging to checkpoints that no longer exist
+DELETE_STALE_WRITES_SQL = """
+with deleted as (
+    delete from checkpoint_writes w
+    where w.thread_id = any(%(threads)s)
+      and not exists (
+          select 1 from checkpoints c
+          where c.thread_id = w.thread_id
+            and c.checkpoint_ns = w.checkpoint_ns
+            and c.checkpoint_id = w.checkpoint_id
+      )
+    returning pg_column_size(w.*) as size
+)
+select count(*) as rows, coalesce(sum(size), 0) as bytes from deleted
+"""
+
+# channel values no remaining checkpoint points at
+DELETE_STALE_BLOBS_SQL = """
+with deleted as (
+    delete from checkpoint_blobs b
+    where b.thread_id = any(%(threads)s)
+      and not exists (
+          select 1 from checkpoints c
+          where c.thread_id = b.thread_id
+            and c.checkpoint_ns = b.checkpoint_ns
+            and c.checkpoint -> 'channel_versions' ->> b.channel = b.version
+      )
+    returning pg_column_size(b.*) as size
+)
+select count(*) as rows, coalesce(sum(size), 0) as bytes from deleted
+"""
+
+
+async def existing_conversation_ids(thread_ids: list) -> set:
+    async with async_session() as session:
+        results = await session.execute(
+            select(ConversationCreate.id).where(ConversationCreate.id.in_(thread_ids))
+        )
+        return set(results.scalars().all())
+
+
+class CheckpointCompactor:
+    """Prunes the LangGraph checkpoint tables in bounded batches.
+
+    Every thread keeps its latest ``keep_latest`` checkpoints plus the writes
+    and blobs they reference, and threads whose conversation row is gone are
+    removed completely. Reported bytes are the sizes of the deleted rows;
+    Postgres reuses that space after (auto)vacuum.
+    """
+
+    def __init__(self, pool,
+                 keep_latest: int = CHECKPOINT_KEEP_LATEST,
+                 batch_size: int = CHECKPOINT_COMPACTION_BATCH,
+                 pause: float = CHECKPOINT_COMPACTION_PAUSE,
+                 interval: float = CHECKPOINT_COMPACTION_INTERVAL,
+                 min_idle: float = CHECKPOINT_COMPACTION_MIN_IDLE):
+        self.pool = pool
+        self.keep_latest = max(keep_latest, 1)
+        self.batch_size = batch_size
+        self.pause = pause
+        self.interval = interval
+        self.min_idle = min_idle
+        self.last_report = None
+        self._task = None
+
+    async def _compact_batch(self, conn, thread_ids: list, report: dict):
+        existing = await existing_conversation_ids(thread_ids)
+        orphans = [thread_id for thread_id in thread_ids if thread_id not in existing]
+        live = [thread_id for thread_id in thread_ids if thread_id in existing]
+
+        async with conn.transaction():
+            async with conn.cursor() as cur:
+                if orphans:
+                    await cur.execute(DELETE_THREADS_SQL, {"threads": orphans})
+                    row = await cur.fetchone()
+                    report["orphan_threads"] += len(orphans)
+                    report["checkpoints_deleted"] += row["checkpoints"]
+                    report["writes_deleted"] += row["writes"]
+                    report["blobs_deleted"] += row["blobs"]
+                    report["bytes_reclaimed"] += int(row["bytes"])
+
+                if live:
+                    params = {"threads": live, "keep": self.keep_latest}
+                    for sql, counter in ((DELETE_OLD_CHECKPOINTS_SQL, "checkpoints_deleted"),
+                                         (DELETE_STALE_WRITES_SQL, "writes_deleted"),
+                                         (DELETE_STALE_BLOBS_SQL, "blobs_deleted")):
+                        await cur.execute(sql, params)
+                        row = await cur.fetchone()
+                        report[counter] += row["rows"]
+                        report["bytes_reclaimed"] += int(row["bytes"])
+
+    async def run_once(self) -> dict:
+        report = {
+            "threads_scanned": 0, "orphan_threads": 0,
+            "checkpoints_deleted": 0, "writes_deleted": 0, "blobs_deleted": 0,
+            "bytes_reclaimed": 0, "skipped": False,
+        }
+        started = time.perf_counter()
+
+        # the run-wide lock lives on its own connection, outside the shared
+        # pool: batches borrow a pooled connection and give it back before
+        # pausing, so message turns never wait on the compactor
+        async with await psycopg.AsyncConnection.connect(
+                self.pool.conninfo, **{**self.pool.kwargs, "autocommit": True}) as lock_conn:
+            locked = await (await lock_conn.execute(COMPACTION_LOCK_SQL)).fetchone()
+            if not locked["locked"]:
+                # another worker is compacting right now
+                report["skipped"] = True
+                return report
+            try:
+                last_thread = ""
+                while True:
+                    async with self.pool.connection() as conn:
+                        cur = await conn.execute(IDLE_THREADS_SQL, (last_thread, self.min_idle, self.batch_size))
+                        thread_ids = [row["thread_id"] for row in await cur.fetchall()]
+                        if not thread_ids:
+                            break
+                        await self._compact_batch(conn, thread_ids, report)
+
+                    report["threads_scanned"] += len(thread_ids)
+                    last_thread = thread_ids[-1]
+                    await asyncio.sleep(self.pause)
+            finally:
+                await lock_conn.execute(COMPACTION_UNLOCK_SQL)
+
+        report["duration_s"] = round(time.perf_counter() - started, 3)
+        report["finished_at"] = time.time()
+        self.last_report = report
+        print(f"🧹 Checkpoint compaction: {report}")
+        return report
+
+    async def _run_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"⚠️ Checkpoint compaction failed: {e}")
+
+    def start(self):
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,57 @@
+import os
+from dotenv import load_dotenv
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+load_dotenv()
+
+DB_URI = os.getenv("DB_URI")
+
+# pool settings, all overridable through the environment
+CHECKPOINT_POOL_MIN_SIZE = int(os.getenv("CHECKPOINT_POOL_MIN_SIZE", "2"))
+CHECKPOINT_POOL_MAX_SIZE = int(os.getenv("CHECKPOINT_POOL_MAX_SIZE", "10"))
+CHECKPOINT_POOL_TIMEOUT = float(os.getenv("CHECKPOINT_POOL_TIMEOUT", "30"))           # seconds to wait for a free connection
+CHECKPOINT_POOL_MAX_LIFETIME = float(os.getenv("CHECKPOINT_POOL_MAX_LIFETIME", "3600"))  # recycle connections after this
+CHECKPOINT_POOL_MAX_IDLE = float(os.getenv("CHECKPOINT_POOL_MAX_IDLE", "600"))
+
+
+async def open_checkpointer() -> tuple[AsyncConnectionPool, AsyncPostgresSaver]:
+    """Open the shared connection pool and set up the checkpoint tables once."""
+    pool = AsyncConnectionPool(
+        conninfo=DB_URI,
+        min_size=CHECKPOINT_POOL_MIN_SIZE,
+        max_size=CHECKPOINT_POOL_MAX_SIZE,
+        timeout=CHECKPOINT_POOL_TIMEOUT,
+        max_lifetime=CHECKPOINT_POOL_MAX_LIFETIME,
+        max_idle=CHECKPOINT_POOL_MAX_IDLE,
+        check=AsyncConnectionPool.check_connection,
+        # same connection settings AsyncPostgresSaver.from_conn_string uses
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        name="checkpointer",
+        open=False,
+    )
+    await pool.open(wait=True)
+
+    checkpointer = AsyncPostgresSaver(pool)
+    # setup() is idempotent, it only runs the migrations that are missing
+    await checkpointer.setup()
+    print("✅ Checkpointer pool opened and 'checkpoints' tables are up to date.")
+    return pool, checkpointer
+
+
+async def close_checkpointer(pool: AsyncConnectionPool):
+    await pool.close()
+
+
+def pool_health(pool: AsyncConnectionPool) -> dict:
+    stats = pool.get_stats()
+    return {
+        "closed": pool.closed,
+        "min_size": pool.min_size,
+        "max_size": pool.max_size,
+        "size": stats.get("pool_size", 0),
+        "available": stats.get("pool_available", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "stats": stats,
+    }
@@ -1,48 +1,126 @@
 from langgraph.graph import StateGraph, MessagesState, START, END
 from pydantic import BaseModel, Field
 from langchain_groq import ChatGroq
-import os
+import os, asyncio
+from typing import List
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
+from llm_scheduler import llm_scheduler, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+from model_routing import GRADER_MODEL, chat_model
 
 load_dotenv()
-os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
-
-llm = ChatGroq(
-    model="llama3-70b-8192",  # or llama3-70b-8192, etc., depending on your Groq model
-    temperature=0.1,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-    # verbose=True or False, as needed
+if os.getenv("GROQ_API_KEY"):
+    os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
+
+GRADER_MAX_TOKENS = int(os.getenv("GRADER_MAX_TOKENS")) if os.getenv("GRADER_MAX_TOKENS") else None
+# articles graded per LLM call, the batches of a turn run concurrently
+GRADER_BATCH_SIZE = int(os.getenv("GRADER_BATCH_SIZE", "8"))
+# deadline of the whole grading stage, ungraded articles are kept
+GRADER_TIMEOUT = float(os.getenv("GRADER_TIMEOUT", "8"))
+# characters of an article shown to the grader
+GRADER_ARTICLE_CHARS = int(os.getenv("GRADER_ARTICLE_CHARS", "800"))
+
+llm = chat_model(GRADER_MODEL, temperature=0.1, max_tokens=GRADER_MAX_TOKENS)
+
+
+class GradeContents(BaseModel):
+    """Binary score for relevance check on retrieved documents."""
+    binary_score: str = Field(
+        description="Retrieved contents from pubmed are relevant to the question, 'yes' or 'no'"
+    )
+
+
+class GradeBatch(BaseModel):
+    """Relevance check of a numbered list of retrieved articles."""
+    relevant: List[int] = Field(
+        description="Numbers of the articles that are relevant to the user question, empty if none is"
     )
+
+
+# the chains are built once, every grading call reuses them
+system = """You are a grader assessing relevance of a retrieved content to a user question. \n
+    If the document contains keyword(s) or semantic meaning related to the user question, grade it as relevant. \n
+    Only respond with 'yes' or 'no'. """
+
+grade_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", system),
+        ("human", "Retrieved content: \n\n {content} \n\n User question: {question}"),
+    ]
+)
+
+retrieval_grader = grade_prompt | llm.with_structured_output(GradeContents)
+
+batch_system = """You are a grader assessing relevance of retrieved articles to a user question. \n
+    An article is relevant if it contains keyword(s) or semantic meaning related to the user question. \n
+    Return the numbers of the relevant articles."""
+
+batch_grade_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", batch_system),
+        ("human", "Retrieved articles: \n\n {articles} \n\n User question: {question}"),
+    ]
+)
+
+def batch_grader_for(grader_llm):
+    """Batch grading chain on the given chat model, e.g. an agent's grader node model."""
+    return batch_grade_prompt | grader_llm.with_structured_output(GradeBatch)
+
+
+batch_grader = batch_grader_for(llm)
+
+
+async def grade_batch(question: str, texts: list, priority: int = PRIORITY_INTERACTIVE,
+                      grader=batch_grader, model: str = GRADER_MODEL) -> list:
+    """One LLM call grading a numbered list of articles, True for the relevant ones."""
+    articles = "\n\n".join(f"[{number}] {text[:GRADER_ARTICLE_CHARS]}"
+                           for number, text in enumerate(texts, 1))
+    result = await llm_scheduler.invoke(grader, {"question": question, "articles": articles},
+                                        model=model, priority=priority)
+    relevant = set(result.relevant)
+    return [number in relevant for number in range(1, len(texts) + 1)]
+
+
+async def grade_documents(question: str, texts: list,
+                          timeout: float = GRADER_TIMEOUT,
+                          batch_size: int = GRADER_BATCH_SIZE,
+                          priority: int = PRIORITY_INTERACTIVE,
+                          grader=batch_grader,
+                          model: str = GRADER_MODEL) -> list:
+    """Relevance verdict for each text, batches graded concurrently.
+
+    Articles whose batch failed or missed the deadline are kept (True),
+    grading may only make the context smaller, never lose an answer.
+    """
+    verdicts = [True] * len(texts)
+    batches = {
+        asyncio.create_task(grade_batch(question, texts[start:start + batch_size], priority, grader, model)): start
+        for start in range(0, len(texts), batch_size)
+    }
+    if not batches:
+        return verdicts
+
+    done, pending = await asyncio.wait(batches, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        print(f"⏱️ Relevance grading missed the {timeout:g}s deadline for {len(pending)} batch(es).")
+
+    for task in done:
+        if task.exception() is not None:
+            print(f"⚠️ Relevance grading failed: {task.exception()}")
+            continue
+        start = batches[task]
+        verdicts[start:start + len(task.result())] = task.result()
+    return verdicts
+
+
 async def grader(state: MessagesState):
-        class GradeContents(BaseModel):
-            """Binary score for relevance check on retrieved documents."""
-            binary_score: str = Field(
-                description="Retrieved contents from pubmed are relevant to the question, 'yes' or 'no'"
-            )
-        
-        # LLM with function call
-        structured_llm_grader = llm.with_structured_output(GradeContents)
-
-        # Prompt
-        system = """You are a grader assessing relevance of a retrieved content to a user question. \n 
-            If the document contains keyword(s) or semantic meaning related to the user question, grade it as relevant. \n
-            Only respond with 'yes' or 'no'. """
-
-        grade_prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", system),
-                ("human", "Retrieved content: \n\n {content} \n\n User question: {question}"),
-            ]
-        )
-
-        retrieval_grader = grade_prompt | structured_llm_grader
-
-        question = "home remedy for common cold?"
-        
-        grader_res = await retrieval_grader.ainvoke({"question": question,
-                                                    "content": state["messages"]})
+        """Grade the last message's content against the latest user question."""
+        question = next((m.content for m in reversed(state["messages"]) if m.type == "human"), "")
+
+        grader_res = await llm_scheduler.invoke(retrieval_grader,
+                                                {"question": question, "content": state["messages"][-1].content},
+                                                model=GRADER_MODEL, priority=PRIORITY_BATCH)
         print(grader_res)
-        return grader_res
\ No newline at end of file
+        return grader_res
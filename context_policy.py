@@ -0,0 +1,119 @@
+import os
+from typing import Optional
+from pydantic import BaseModel
+from dotenv import load_dotenv
+from langchain_core.messages import SystemMessage
+
+load_dotenv()
+
+# how many dropped turns to collect before the rolling summary is extended
+SUMMARY_BATCH_TURNS = int(os.getenv("SUMMARY_BATCH_TURNS", "2"))
+
+
+class ContextPolicy(BaseModel):
+    """What part of the history is sent to the LLM each turn.
+
+    max_turns: number of most recent turns (a human message and everything
+        after it) kept verbatim, 0 keeps the whole history.
+    summarize: fold turns that fall out of the window into a rolling summary.
+    """
+    max_turns: int = 8
+    summarize: bool = True
+
+
+def policy_for(agent) -> ContextPolicy:
+    return ContextPolicy(max_turns=agent.context_turns, summarize=agent.context_summary)
+
+
+def _leading_system_count(messages) -> int:
+    count = 0
+    for message in messages:
+        if message.type != "system":
+            break
+        count += 1
+    return count
+
+
+def window_start(messages, max_turns: int) -> int:
+    """Index of the first message of the last ``max_turns`` turns, found by
+    scanning back from the end so the cost doesn't grow with the history."""
+    head = _leading_system_count(messages)
+    if not max_turns:
+        return head
+
+    turns = 0
+    for index in range(len(messages) - 1, head - 1, -1):
+        if messages[index].type == "human":
+            turns += 1
+            if turns == max_turns:
+                return index
+    return head
+
+
+def _current_turn_start(messages, start: int) -> int:
+    for index in range(len(messages) - 1, start - 1, -1):
+        if messages[index].type == "human":
+            return index
+    return start
+
+
+def build_context(messages, summary: str, policy: Optional[ContextPolicy], summarized_upto: int = 0):
+    """System prompt + rolling summary + the last turns of the conversation.
+
+    With a summary, turns that left the window but aren't folded into it
+    yet (before ``summarized_upto``) stay verbatim, so no turn is ever in
+    neither. Tool calls and tool results of earlier turns are dropped, only
+    the current turn keeps them.
+    """
+    if policy is None:
+        return list(messages)
+
+    head = _leading_system_count(messages)
+    start = window_start(messages, policy.max_turns)
+    if policy.summarize and policy.max_turns:
+        start = min(start, max(summarized_upto, head))
+    current = _current_turn_start(messages, start)
+
+    context = list(messages[:head])
+    if summary and policy.summarize:
+        context.append(SystemMessage(f"Summary of the earlier conversation:\n{summary}"))
+
+    for index in range(start, len(messages)):
+        message = messages[index]
+        if index < current and (message.type == "tool"
+                                or (message.type == "ai" and message.tool_calls)):
+            continue
+        context.append(message)
+    return context
+
+
+def pending_summary_range(messages, summarized_upto: int, policy: Optional[ContextPolicy]):
+    """(start, end) of messages that left the window and aren't in the summary
+    yet, or None while fewer than SUMMARY_BATCH_TURNS turns are waiting.
+
+    The window is taken as the next turn will see it. Waiting turns are
+    still sent verbatim by build_context until they are summarized.
+    """
+    if policy is None or not policy.summarize or not policy.max_turns:
+        return None
+
+    start = max(summarized_upto, _leading_system_count(messages))
+    # the next turn adds one human message, so keep one turn less here
+    end = window_start(messages, policy.max_turns - 1) if policy.max_turns > 1 else len(messages)
+    if end <= start:
+        return None
+
+    waiting = sum(1 for message in messages[start:end] if message.type == "human")
+    if waiting < SUMMARY_BATCH_TURNS:
+        return None
+    return start, end
+
+
+def format_transcript(messages) -> str:
+    lines = []
+    for message in messages:
+        if message.type == "human":
+            lines.append(f"User: {message.content}")
+        elif message.type == "ai" and not message.tool_calls and message.content:
+            lines.append(f"Assistant: {message.content}")
+    return "\n".join(lines)
@@ -1,16 +1,24 @@
 from fastapi import APIRouter, Request, HTTPException, Depends, Query
 from models import *
 from dotenv import load_dotenv
-import asyncpg, os
-from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+import os, json, base64
 from typing import Annotated
 from sqlmodel import select
+from sqlalchemy import tuple_
+from sse_starlette.sse import EventSourceResponse
 from sql_models import AgentCreate, ConversationCreate
 from persistDB import AsyncSessionDep
+from deps import CheckpointerDep
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, ToolMessage, AIMessage
 # from graph import stream_graph_updates, create_graph
 from models import ConversationRead, Conversation
-from test_mcp_1 import create_graph, stream_graph_updates
+from test_mcp_1 import stream_graph_updates, astream_graph_events, turn_token_usage
+from graph_registry import get_graph
+from message_history import load_messages, paginate
+from token_ledger import token_ledger
+from answer_cache import answer_cache, ANSWER_CACHE_ENABLED
+from agent_cache import agent_cache
+from datetime import datetime, timezone
 
 
 load_dotenv() 
@@ -27,11 +35,10 @@ router = APIRouter()
 async def start_conversation(
     request: NewConversationRequest,
     session: AsyncSessionDep,
+    checkpointer: CheckpointerDep,
 ):
     # Fetch the agent
-    statement = select(AgentCreate).where(AgentCreate.name == "medical agent")
-    results = await session.execute(statement)
-    agent = results.scalars().first()
+    agent = await agent_cache.get_by_name(session, "medical agent")
 
     if not agent:
         raise HTTPException(status_code=404, detail="Provide agent ID")
@@ -50,60 +57,60 @@ async def start_conversation(
 
     system_message = [SystemMessage(content=agent.systemPrompt)]
 
-    DB_URI = os.getenv("DB_URI")
+    graph = await get_graph(checkpointer, agent, convo.title)
 
-    # 🧠 Check if 'checkpoints' table exists
-    conn = await asyncpg.connect(dsn=DB_URI)
-    try:
-        exists = await conn.fetchval("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = 'checkpoints'
-            )
-        """)
-    finally:
-        await conn.close()
-
-    # 🏁 Initialize checkpointer
-    async with AsyncPostgresSaver.from_conn_string(DB_URI) as checkpointer:
-        if not exists:
-            await checkpointer.setup()
-            print("✅ 'checkpoints' table created.")
-        else:
-            print("ℹ️ 'checkpoints' table already exists.")
-
-        graph = await create_graph(
-            checkpointer,
-            convo.title,
-            creativity=agent.creativity,
-        )
-
-        await graph.aupdate_state(conv_config, {"messages": system_message}, as_node="query_or_respond")
+    await graph.aupdate_state(conv_config, {"messages": system_message}, as_node="query_or_respond")
 
     # 🗃️ Save conversation
     session.add(convo)
     await session.commit()
     await session.refresh(convo)
-    await session.refresh(agent)
 
     return convo
 
 
 
 
+# a conversation's first question can be answered from the per-agent answer cache
+async def is_first_turn(checkpointer, convo) -> bool:
+    if not ANSWER_CACHE_ENABLED or token_ledger.total(convo) > 0:
+        return False
+    messages = await load_messages(checkpointer, convo.id)
+    return not any(message.type == "human" for message in messages)
+
+
+# storing a cache hit in the thread as a normal turn
+async def record_cached_answer(graph, conv_config, text: str, content: str) -> AIMessage:
+    answer = AIMessage(
+        content=content,
+        additional_kwargs={"timestamp": datetime.now(timezone.utc), "cached": True},
+    )
+    await graph.aupdate_state(conv_config,
+                              {"messages": [HumanMessage(content=text), answer]},
+                              as_node="summarize_history")
+    return answer
+
+
+def is_cacheable(answer) -> bool:
+    return (bool(answer.content) and not answer.tool_calls
+            and "error_details" not in answer.additional_kwargs
+            and "Connection issue" not in answer.content)
+
+
 @router.post("/{conversation_id}/message", description="""To send messages/human prompts
                                             to LLM through API and receive a response.
                                             We also count prompt and completion tokens
                                             and store them in conversations table SQLite.
                                             """)
 async def send_message(conversation_id: str, message: Message, session: AsyncSessionDep,
+                       checkpointer: CheckpointerDep,
                        ):
     
     convo = await session.get(ConversationCreate, conversation_id)
     if not convo:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    agent = await session.get(AgentCreate, convo.agent_id)
+    agent = await agent_cache.get(session, convo.agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
 
@@ -111,41 +118,114 @@ async def send_message(conversation_id: str, message: Message, session: AsyncSes
 
     # tools_list = await client.get_tools()
 
-    async with AsyncPostgresSaver.from_conn_string(os.getenv("DB_URI")) as checkpointer:
-        
-        
-        graph = await create_graph(checkpointer,
-                                    convo.title,
-                                    # tools_list,
-                                    creativity=agent.creativity,
-                                   )
+    graph = await get_graph(checkpointer, agent, convo.title)
+
+    if not graph:
+        raise HTTPException(status_code=500, detail="Graph not found in memory.")
 
-        if not graph:
-            raise HTTPException(status_code=500, detail="Graph not found in memory.")
+    first_turn = await is_first_turn(checkpointer, convo)
+    cached = answer_cache.get(agent.id, message.text) if first_turn else None
+    if cached is not None:
+        answer = await record_cached_answer(graph, conv_config, message.text, cached)
+        return {
+            "user": (message.text, 0),
+            "assistant": (cached, 0),
+            "timestamp": answer.additional_kwargs['timestamp'].strftime("%Y-%m-%d %H:%M:%S %Z"),
+            "cached": True,
+        }
 
-        res = await stream_graph_updates(message.text, conv_config, graph)
-        print(res)
-    response_content = res['query_or_respond']['messages'][-1].content
+    res = await stream_graph_updates(message.text, conv_config, graph)
+    print(res)
+    # the answer comes from generate when tools were called, else from query_or_respond
+    answer = (res.get('generate') or res['query_or_respond'])['messages'][-1]
+    response_content = answer.content
 
     if "Connection issue" in response_content:
         return {"assistant": response_content}
     else:
-        dt = res['query_or_respond']['messages'][-1].additional_kwargs['timestamp'].strftime("%Y-%m-%d %H:%M:%S %Z")
-        tokens_usage = res['query_or_respond']['messages'][-1].additional_kwargs['tokens_usage']['token_usage']
+        dt = answer.additional_kwargs['timestamp'].strftime("%Y-%m-%d %H:%M:%S %Z")
+        prompt_tokens, completion_tokens = turn_token_usage(res)
                     
-        convo.total_tokens += tokens_usage['prompt_tokens']
-        convo.total_tokens += tokens_usage['completion_tokens']
+        # written behind the response by the token ledger
+        token_ledger.add(conversation_id, prompt_tokens + completion_tokens)
 
-        # Save updated total_tokens back to DB
-        session.add(convo)
-        await session.commit()
+        if first_turn and is_cacheable(answer):
+            answer_cache.put(agent.id, message.text, response_content)
 
         return {
-            "user": (message.text, tokens_usage['prompt_tokens']),
-            "assistant": (response_content, tokens_usage['completion_tokens']),
+            "user": (message.text, prompt_tokens),
+            "assistant": (response_content, completion_tokens),
             "timestamp": dt
         }
 
+
+@router.post("/{conversation_id}/message/stream", description="""Streaming variant of sending a message.
+                                            LLM tokens and node progress (tool call started,
+                                            tool finished, generating) are sent as Server-Sent
+                                            Events, tokens are counted when the stream completes.
+                                            """)
+async def send_message_stream(conversation_id: str, message: Message, session: AsyncSessionDep,
+                              checkpointer: CheckpointerDep,
+                              ):
+
+    convo = await session.get(ConversationCreate, conversation_id)
+    if not convo:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    agent = await agent_cache.get(session, convo.agent_id)
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
+    conv_config = {"configurable": {"thread_id": conversation_id}}
+
+    graph = await get_graph(checkpointer, agent, convo.title)
+
+    first_turn = await is_first_turn(checkpointer, convo)
+    cached = answer_cache.get(agent.id, message.text) if first_turn else None
+
+    async def event_stream():
+        if cached is not None:
+            answer = await record_cached_answer(graph, conv_config, message.text, cached)
+            yield {"event": "token", "data": json.dumps({"node": "generate", "content": cached})}
+            yield {"event": "done", "data": json.dumps({
+                "assistant": cached,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "timestamp": answer.additional_kwargs["timestamp"].strftime("%Y-%m-%d %H:%M:%S %Z"),
+                "cached": True,
+            })}
+            return
+
+        updates = {}
+        try:
+            async for event, data in astream_graph_events(message.text, conv_config, graph):
+                if event == "update":
+                    updates[data["node"]] = {"messages": data["messages"]}
+                    continue
+                yield {"event": event, "data": json.dumps(data)}
+        except Exception as e:
+            yield {"event": "error", "data": json.dumps({"detail": str(e)})}
+            return
+
+        final = updates.get("generate") or updates.get("query_or_respond")
+        answer = final["messages"][-1] if final and final["messages"] else None
+        prompt_tokens, completion_tokens = turn_token_usage(updates)
+
+        token_ledger.add(conversation_id, prompt_tokens + completion_tokens)
+
+        if first_turn and answer is not None and is_cacheable(answer):
+            answer_cache.put(agent.id, message.text, answer.content)
+
+        yield {"event": "done", "data": json.dumps({
+            "assistant": answer.content if answer else "",
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "timestamp": answer.additional_kwargs["timestamp"].strftime("%Y-%m-%d %H:%M:%S %Z")
+                         if answer and "timestamp" in answer.additional_kwargs else None,
+        })}
+
+    return EventSourceResponse(event_stream())
+
     
 
 @router.get("/{user_id}", description="Fetch all conversations for a user.")
@@ -159,32 +239,83 @@ async def get_all_conversations(
     results = await session.execute(
         select(ConversationCreate)
         .where(ConversationCreate.user_id == user_id)
-        .order_by(ConversationCreate.created_at.desc())
+        .order_by(ConversationCreate.created_at.desc(), ConversationCreate.id.desc())
         .offset(offset)
         .limit(limit)
     )
     conversations = results.scalars().all()
-    return conversations
+    # include token usage that hasn't been flushed yet
+    return [
+        ConversationRead(**{**convo.model_dump(), "total_tokens": token_ledger.total(convo)})
+        for convo in conversations
+    ]
+
+
+def encode_cursor(convo) -> str:
+    return base64.urlsafe_b64encode(json.dumps([convo.created_at.isoformat(), convo.id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        created_at, conversation_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), conversation_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/{user_id}/page", response_model=ConversationPage,
+            description="""To grab one page of a user's conversations, newest first.
+                         Pass next_cursor as `cursor` for the next page, every page
+                         costs the same however deep it is.
+                         """)
+async def get_conversations_page(
+    user_id: str,
+    session: AsyncSessionDep,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: Optional[str] = None,
+):
+    statement = select(ConversationCreate).where(ConversationCreate.user_id == user_id)
+    if cursor:
+        # seek past the last row of the previous page instead of OFFSET
+        statement = statement.where(
+            tuple_(ConversationCreate.created_at, ConversationCreate.id) < tuple_(*decode_cursor(cursor))
+        )
+    results = await session.execute(
+        statement
+        .order_by(ConversationCreate.created_at.desc(), ConversationCreate.id.desc())
+        .limit(limit + 1)
+    )
+    conversations = results.scalars().all()
+    page = conversations[:limit]
+    return {
+        "conversations": [
+            ConversationRead(**{**convo.model_dump(), "total_tokens": token_ledger.total(convo)})
+            for convo in page
+        ],
+        "has_more": len(conversations) > limit,
+        "next_cursor": encode_cursor(page[-1]) if len(conversations) > limit else None,
+    }
 
 
 @router.get("/{conversation_id}", response_model=Conversation,
             description="To grab a single conversation.")
 async def get_conversation(conversation_id: str, session: AsyncSessionDep):
-    conversation = session.get(ConversationCreate, conversation_id)
+    conversation = await session.get(ConversationCreate, conversation_id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    return conversation
+    return Conversation(**{**conversation.model_dump(), "total_tokens": token_ledger.total(conversation)})
 
 
 @router.get("/{conversation_id}/messages",
             description="To grab all message of a conversation.")
-async def get_conversation_messages(conversation_id: str, session: AsyncSessionDep):
+async def get_conversation_messages(conversation_id: str, session: AsyncSessionDep,
+                                    checkpointer: CheckpointerDep):
 
     convo = await session.get(ConversationCreate, conversation_id)
     if not convo:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    agent = await session.get(AgentCreate, convo.agent_id)
+    agent = await agent_cache.get(session, convo.agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
     
@@ -192,18 +323,38 @@ async def get_conversation_messages(conversation_id: str, session: AsyncSessionD
 
     
 
-    async with AsyncPostgresSaver.from_conn_string(os.getenv("DB_URI")) as checkpointer:
-        graph = await create_graph(checkpointer, convo.title, agent.creativity)
+    graph = await get_graph(checkpointer, agent, convo.title)
+
+    snapshot = await graph.aget_state(conv_config)
+
+    # Filter out messages of type 'system' and 'tool'
+    filtered_messages = [
+        msg for msg in snapshot.values['messages']
+        if msg.type not in ("system", "tool")
+    ]
+
+    return filtered_messages
 
-        snapshot = await graph.aget_state(conv_config)
 
-        # Filter out messages of type 'system' and 'tool'
-        filtered_messages = [
-            msg for msg in snapshot.values['messages']
-            if msg.type not in ("system", "tool")
-        ]
+@router.get("/{conversation_id}/messages/page", response_model=MessagePage,
+            description="""To grab one page of a conversation's messages, latest first page.
+                         Pass next_before as `before` for older messages or next_after
+                         as `after` for newer ones. Reads the checkpoint directly, no graph.
+                         """)
+async def get_conversation_messages_page(
+    conversation_id: str,
+    session: AsyncSessionDep,
+    checkpointer: CheckpointerDep,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+):
+    convo = await session.get(ConversationCreate, conversation_id)
+    if not convo:
+        raise HTTPException(status_code=404, detail="Conversation not found")
 
-        return filtered_messages
+    messages = await load_messages(checkpointer, conversation_id)
+    return paginate(messages, limit, before=before, after=after)
 
 
 
@@ -216,6 +367,7 @@ async def delete_conversation(conversation_id: str, session: AsyncSessionDep):
     
     await session.delete(conversation)  # Optional: SQLAlchemy sometimes allows this without await
     await session.commit()              
+    token_ledger.discard(conversation_id)
 
     return {"detail": "Conversation deleted."}
 
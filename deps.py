@@ -2,4 +2,15 @@
 # from langchain_mcp_adapters.client import MultiServerMCPClient
 
 # def get_mcp_client(request: Request) -> MultiServerMCPClient:
-#     return request.app.state.mcp_client
\ No newline at end of file
+#     return request.app.state.mcp_client
+
+from typing import Annotated
+from fastapi import Depends, Request
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+
+# the checkpointer is created once in main.lifespan and shared by all requests
+def get_checkpointer(request: Request) -> AsyncPostgresSaver:
+    return request.app.state.checkpointer
+
+CheckpointerDep = Annotated[AsyncPostgresSaver, Depends(get_checkpointer)]
@@ -0,0 +1,72 @@
+import os, re, uuid
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage
+
+load_dotenv()
+
+# tools called with the user's question in direct retrieval mode
+DIRECT_RETRIEVAL_TOOLS = [name.strip() for name in
+                          os.getenv("DIRECT_RETRIEVAL_TOOLS", "search_abstracts,search_medrxiv_key_words").split(",")
+                          if name.strip()]
+
+_STOPWORDS = {
+    "a", "about", "am", "an", "and", "any", "are", "as", "at", "be", "can", "could", "did",
+    "do", "does", "for", "from", "give", "have", "how", "i", "if", "in", "is", "it", "its",
+    "latest", "me", "my", "of", "on", "or", "please", "recent", "research", "say", "says",
+    "show", "should", "studies", "study", "tell", "that", "the", "there", "this", "to",
+    "what", "whats", "when", "where", "which", "who", "why", "with", "would", "you",
+}
+
+
+def keywords(text: str) -> list:
+    words = re.findall(r"[\w-]+", text.lower())
+    return [word for word in words if word not in _STOPWORDS]
+
+
+def rewrite_query(messages) -> str:
+    """Search terms of the latest question, no LLM involved.
+
+    Question words and filler are dropped. A short follow-up ("and in
+    children?") borrows the terms of the previous question.
+    """
+    questions = [m.content for m in messages if m.type == "human" and isinstance(m.content, str)]
+    if not questions:
+        return ""
+    terms = keywords(questions[-1])
+    if len(terms) <= 2 and len(questions) > 1:
+        previous = [term for term in keywords(questions[-2]) if term not in terms]
+        terms = previous + terms
+    return " ".join(terms) or questions[-1]
+
+
+def _query_argument(tool):
+    """First required string argument of the tool, where the query goes."""
+    schema = tool.args_schema if isinstance(tool.args_schema, dict) else tool.args_schema.model_json_schema()
+    properties = schema.get("properties", {})
+    for name in schema.get("required", []):
+        if properties.get(name, {}).get("type") == "string":
+            return name
+    return None
+
+
+def retrieval_tools(tools_list) -> dict:
+    """name -> query argument of the configured tools that are available."""
+    by_name = {tool.name: tool for tool in tools_list}
+    selected = {}
+    for name in DIRECT_RETRIEVAL_TOOLS:
+        tool = by_name.get(name)
+        argument = _query_argument(tool) if tool is not None else None
+        if argument:
+            selected[name] = argument
+    return selected
+
+
+def direct_tool_calls(tools: dict, query: str) -> AIMessage:
+    """The tool-call message query_or_respond would have produced."""
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": name, "args": {argument: query}, "id": f"direct_{uuid.uuid4().hex[:12]}"}
+                    for name, argument in tools.items()],
+        additional_kwargs={"timestamp": datetime.now(timezone.utc), "retrieval": "direct"},
+    )
@@ -0,0 +1,240 @@
+"""Stand-ins for Groq and the MCP servers, to load-test and benchmark offline.
+
+LLM_PROVIDER=fake turns every chat model of the app into a FakeChatModel:
+no network, a sampled latency, token usage estimated from the prompt and
+tool calls to the search tools for a new question.
+
+    python fake_services.py
+
+serves canned PubMed and medRxiv results on the ports the app expects
+(8001 and 8002) with a sampled latency per call, in place of
+mcp_servers/run_mcp_servers.py.
+
+Latencies are given in milliseconds as "fixed:200", "uniform:100:500",
+"normal:300:50" or "lognormal:300:0.5" (median and sigma).
+
+The rate-limit scheduler still applies GROQ_RPM/GROQ_TPM to the fake model:
+keep them to emulate Groq's ceilings, raise them to measure the app alone.
+"""
+import asyncio, json, os, random, re, time, uuid
+from typing import List, Optional
+from dotenv import load_dotenv
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+load_dotenv()
+
+FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "lognormal:400:0.4")
+FAKE_LLM_COMPLETION_TOKENS = int(os.getenv("FAKE_LLM_COMPLETION_TOKENS", "120"))
+# tools the fake model calls for a new question, "none" to always answer directly
+FAKE_LLM_TOOL_CALLS = os.getenv("FAKE_LLM_TOOL_CALLS", "search_abstracts,search_medrxiv_key_words")
+
+FAKE_MCP_LATENCY = os.getenv("FAKE_MCP_LATENCY", "lognormal:300:0.6")
+FAKE_MCP_RESULTS = int(os.getenv("FAKE_MCP_RESULTS", "7"))
+# share of tool calls that fail, to exercise the error paths
+FAKE_MCP_ERROR_RATE = float(os.getenv("FAKE_MCP_ERROR_RATE", "0"))
+FAKE_MCP_PUBMED_PORT = int(os.getenv("FAKE_MCP_PUBMED_PORT", "8001"))
+FAKE_MCP_MEDRXIV_PORT = int(os.getenv("FAKE_MCP_MEDRXIV_PORT", "8002"))
+
+_FILLER = ("the evidence from recent trials suggests a moderate benefit although "
+           "study sizes were small and further research is needed before firm "
+           "recommendations can be made for clinical practice").split()
+
+
+def sample_latency(spec: str) -> float:
+    """Seconds, drawn from a distribution spec in milliseconds."""
+    kind, *params = spec.split(":")
+    params = [float(p) for p in params]
+    if kind == "fixed":
+        ms = params[0]
+    elif kind == "uniform":
+        ms = random.uniform(params[0], params[1])
+    elif kind == "normal":
+        ms = random.gauss(params[0], params[1])
+    elif kind == "lognormal":
+        ms = params[0] * random.lognormvariate(0, params[1])
+    else:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    return max(ms, 0) / 1000
+
+
+def _query_argument(tool: dict) -> Optional[str]:
+    parameters = tool["function"].get("parameters", {})
+    for name in parameters.get("required", []):
+        if parameters.get("properties", {}).get(name, {}).get("type") == "string":
+            return name
+    return None
+
+
+def _structured_args(tool: dict, prompt: str) -> dict:
+    """Arguments for a structured-output schema: relevant/yes/everything kept."""
+    args = {}
+    for name, spec in tool["function"].get("parameters", {}).get("properties", {}).items():
+        kind = spec.get("type")
+        if kind == "string":
+            args[name] = "yes"
+        elif kind in ("integer", "number"):
+            args[name] = 1
+        elif kind == "boolean":
+            args[name] = True
+        elif kind == "array":
+            # numbered items in the prompt, e.g. the articles of a grading batch
+            args[name] = [int(n) for n in re.findall(r"\[(\d+)\]", prompt)]
+    return args
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model answering locally after a sampled delay."""
+
+    model: str = "fake"
+    latency: str = FAKE_LLM_LATENCY
+    completion_tokens: int = FAKE_LLM_COMPLETION_TOKENS
+    tool_calls: str = FAKE_LLM_TOOL_CALLS
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice)
+
+    def _respond(self, messages, tools=None, tool_choice=None) -> AIMessage:
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4 + 4 * len(messages)
+        last = messages[-1]
+        tools = tools or []
+
+        tool_calls = []
+        if tools and tool_choice not in (None, "none", "auto") and len(tools) == 1:
+            # with_structured_output binds one schema and forces it
+            tool_calls = [(tools[0]["function"]["name"], _structured_args(tools[0], str(last.content)))]
+        elif tools and last.type == "human" and self.tool_calls != "none":
+            wanted = {name.strip() for name in self.tool_calls.split(",")}
+            for tool in tools:
+                argument = _query_argument(tool)
+                if tool["function"]["name"] in wanted and argument:
+                    tool_calls.append((tool["function"]["name"], {argument: str(last.content)}))
+
+        if tool_calls:
+            completion_tokens = 20 * len(tool_calls)
+            message = AIMessage(content="", tool_calls=[
+                {"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"} for name, args in tool_calls
+            ])
+        else:
+            question = next((m.content for m in reversed(messages) if m.type == "human"), "")
+            words = [random.choice(_FILLER) for _ in range(self.completion_tokens)]
+            message = AIMessage(content=f"Stand-in answer about {question[:80]}: " + " ".join(words) + ".")
+            completion_tokens = self.completion_tokens
+
+        message.usage_metadata = {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+                                  "total_tokens": prompt_tokens + completion_tokens}
+        message.response_metadata = {"model_name": self.model, "finish_reason": "stop"}
+        return message
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(sample_latency(self.latency))
+        message = self._respond(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(sample_latency(self.latency))
+        message = self._respond(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        # the latency is the time to the first token, the rest streams quickly
+        await asyncio.sleep(sample_latency(self.latency))
+        message = self._respond(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+
+        if message.tool_calls:
+            chunks = [AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                for index, call in enumerate(message.tool_calls)
+            ])]
+        else:
+            chunks = [AIMessageChunk(content=word + " ") for word in message.content.split(" ")]
+        chunks[-1].usage_metadata = message.usage_metadata
+        chunks[-1].response_metadata = message.response_metadata
+
+        for chunk in chunks:
+            await asyncio.sleep(0)
+            if run_manager and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+
+# --------------------
+# Fake MCP servers
+# --------------------
+
+def _pubmed_results(term: str, retmax: int) -> list:
+    return [{"title": f"{term.capitalize()}: findings of study {i + 1}",
+             "abstract": f"We investigated {term} in a cohort of {random.randint(40, 4000)} patients. "
+                         + " ".join(random.choice(_FILLER) for _ in range(60)) + "...",
+             "pmid": str(30000000 + abs(hash((term, i))) % 9000000)}
+            for i in range(min(retmax, FAKE_MCP_RESULTS))]
+
+
+def _medrxiv_results(query: str, num_results: int) -> list:
+    return [{"title": f"{query.capitalize()} preprint {i + 1}",
+             "authors": "Doe J; Roe R",
+             "doi": f"10.1101/2025.{abs(hash((query, i))) % 100000:05d}",
+             "abstract": " ".join(random.choice(_FILLER) for _ in range(50))}
+            for i in range(min(num_results, FAKE_MCP_RESULTS))]
+
+
+async def _delay(tool: str):
+    await asyncio.sleep(sample_latency(FAKE_MCP_LATENCY))
+    if random.random() < FAKE_MCP_ERROR_RATE:
+        raise RuntimeError(f"stand-in failure of {tool}")
+
+
+def build_fake_mcp_servers():
+    from mcp.server.fastmcp import FastMCP
+
+    pubmed = FastMCP("PubMedMCP", host="127.0.0.1", port=FAKE_MCP_PUBMED_PORT)
+    medrxiv = FastMCP("MedRxivMCP", host="127.0.0.1", port=FAKE_MCP_MEDRXIV_PORT)
+
+    @pubmed.tool()
+    async def search_abstracts(term: str, mindate: Optional[str] = None, maxdate: Optional[str] = None,
+                               retmax: int = 7, sort: str = "relevance") -> dict:
+        """Optimized: Search PubMed and return key info from top abstracts."""
+        await _delay("search_abstracts")
+        return {"results": _pubmed_results(term, retmax)}
+
+    @medrxiv.tool()
+    async def search_medrxiv_key_words(key_words: str, num_results: int = 10) -> List[dict]:
+        """Search for articles on medRxiv using key words."""
+        await _delay("search_medrxiv_key_words")
+        return _medrxiv_results(key_words, num_results)
+
+    @medrxiv.tool()
+    async def get_medrxiv_metadata(doi: str) -> dict:
+        """Fetch metadata for a medRxiv article using its DOI."""
+        await _delay("get_medrxiv_metadata")
+        return {"doi": doi, "title": "Stand-in preprint", "date": "2025-01-01"}
+
+    @medrxiv.tool()
+    async def get_nice_guidance(query: str) -> str:
+        """Get guidance for a given topic from NICE."""
+        await _delay("get_nice_guidance")
+        return f"Stand-in NICE guidance on {query}: " + " ".join(random.choice(_FILLER) for _ in range(80))
+
+    return pubmed, medrxiv
+
+
+async def serve_fake_mcp_servers():
+    import uvicorn
+
+    servers = []
+    for mcp in build_fake_mcp_servers():
+        config = uvicorn.Config(mcp.streamable_http_app(), host=mcp.settings.host,
+                                port=mcp.settings.port, log_level="warning")
+        servers.append(uvicorn.Server(config))
+        print(f"🧪 Fake MCP server '{mcp.name}' on port {mcp.settings.port}")
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+if __name__ == "__main__":
+    asyncio.run(serve_fake_mcp_servers())
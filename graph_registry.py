@@ -0,0 +1,68 @@
+import asyncio
+from test_mcp_1 import create_graph
+from tool_catalog import tool_catalog
+from context_policy import policy_for
+from model_routing import routing_for
+from agent_cache import agent_cache
+
+# process-wide registry of compiled graphs, keyed by agent configuration
+# (agent id, creativity, context policy, retrieval mode and grading,
+# tool-set version, node models). A message turn only runs the graph,
+# building happens once per key.
+_graphs = {}
+_build_locks = {}
+
+
+def graph_key(agent):
+    return (agent.id, agent.creativity, agent.context_turns, agent.context_summary,
+            agent.retrieval_mode, agent.relevance_grading, tool_catalog.version, routing_for(agent).model_dump_json())
+
+
+async def get_graph(checkpointer, agent, convo_db_name: str = ""):
+    key = graph_key(agent)
+
+    graph = _graphs.get(key)
+    if graph is None:
+        lock = _build_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            graph = _graphs.get(key)
+            if graph is None:
+                tools_list = await tool_catalog.get()
+                graph = await create_graph(checkpointer,
+                                           convo_db_name,
+                                           creativity=agent.creativity,
+                                           tools_list=tools_list,
+                                           routing=routing_for(agent),
+                                           context_policy=policy_for(agent),
+                                           retrieval_mode=agent.retrieval_mode,
+                                           relevance_grading=agent.relevance_grading)
+                # don't pin a tool-less graph while the MCP servers are down
+                if tools_list:
+                    # keyed by the catalog version the graph was actually built with
+                    _graphs[graph_key(agent)] = graph
+                    print(f"🧩 Compiled graph cached for agent {agent.id}.")
+        _build_locks.pop(key, None)
+
+    # compiled graphs are cheap to re-bind to another checkpointer
+    if graph.checkpointer is not checkpointer:
+        graph = graph.copy(update={"checkpointer": checkpointer})
+    return graph
+
+
+def evict_agent(agent_id: str):
+    """Drop every cached graph built for an agent, e.g. after it was updated or deleted."""
+    for key in [k for k in _graphs if k[0] == agent_id]:
+        del _graphs[key]
+
+
+def invalidate_tools():
+    """Drop every cached graph, they were built with an outdated tool set."""
+    _graphs.clear()
+
+
+tool_catalog.subscribe(invalidate_tools)
+agent_cache.subscribe(evict_agent)
+
+
+def registry_stats():
+    return {"graphs": len(_graphs), "tools_version": tool_catalog.version}
@@ -0,0 +1,225 @@
+import asyncio, heapq, itertools, json, os, re, time
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# provider ceilings per model, the response headers refine them at runtime
+GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = int(os.getenv("GROQ_TPM", "6000"))
+# reserved for the completion until the real usage is known
+LLM_COMPLETION_TOKENS_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", "256"))
+
+# lower runs first
+PRIORITY_INTERACTIVE = 0    # the answer a user is waiting for
+PRIORITY_BATCH = 1          # grading, evaluation
+PRIORITY_BACKGROUND = 2     # summaries and other housekeeping
+
+_DURATION = re.compile(r"(?:(\d+)h)?(?:(\d+)m(?!s))?(?:([\d.]+)s)?(?:([\d.]+)ms)?$")
+
+
+def parse_duration(value: str) -> float:
+    """Groq reset headers look like '2m59.56s', '7.66s' or '120ms'."""
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    match = _DURATION.match(value.strip())
+    if not match:
+        return 0.0
+    hours, minutes, seconds, millis = match.groups()
+    return (int(hours or 0) * 3600 + int(minutes or 0) * 60
+            + float(seconds or 0) + float(millis or 0) / 1000)
+
+
+def estimate_tokens(runnable, input) -> int:
+    """Rough prompt size, ~4 characters per token, bound tool schemas included."""
+    if isinstance(input, list):
+        text = "".join(str(getattr(message, "content", message)) for message in input)
+        overhead = 4 * len(input)
+    else:
+        text, overhead = str(input), 0
+    tools = getattr(runnable, "kwargs", {}).get("tools")
+    if tools:
+        text += json.dumps(tools, default=str)
+    return len(text) // 4 + overhead
+
+
+class TokenBucket:
+    """Refills continuously to ``capacity`` over ``period`` seconds."""
+
+    def __init__(self, capacity: float, period: float = 60):
+        self.capacity = capacity
+        self.period = period
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / self.period)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        # a request larger than the bucket waits for a full one
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * self.period / self.capacity
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def clamp(self, remaining: float):
+        self._refill()
+        self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """RPM and TPM buckets of one model plus the priority queue in front of them."""
+
+    def __init__(self, model: str, rpm: int = GROQ_RPM, tpm: int = GROQ_TPM):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.paused_until = 0.0
+        self._queue = []
+        self._seq = itertools.count()
+        self._timer = None
+        self.granted = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._queue:
+            _, _, tokens, future = self._queue[0]
+            if future.done():
+                # the caller went away while queued
+                heapq.heappop(self._queue)
+                continue
+
+            wait = max(self.paused_until - time.monotonic(),
+                       self.requests.wait_time(1),
+                       self.tokens.wait_time(tokens))
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            future.set_result(None)
+
+    async def acquire(self, priority: int, tokens: int) -> float:
+        """Wait for a slot, returns the seconds spent in the queue."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), tokens, future))
+        started = time.monotonic()
+        self._dispatch()
+        await future
+
+        waited = time.monotonic() - started
+        self.granted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def settle(self, estimated: int, actual: int):
+        """Correct the token bucket once the real usage is known."""
+        self.tokens.take(actual - estimated)
+
+    def observe(self, response: httpx.Response):
+        headers = response.headers
+        if "x-ratelimit-limit-tokens" in headers:
+            self.tokens.capacity = float(headers["x-ratelimit-limit-tokens"])
+        if "x-ratelimit-remaining-tokens" in headers:
+            self.tokens.clamp(float(headers["x-ratelimit-remaining-tokens"]))
+        # Groq's request headers count per day, only respect them when exhausted
+        if headers.get("x-ratelimit-remaining-requests") == "0":
+            self._pause(parse_duration(headers.get("x-ratelimit-reset-requests")))
+
+        if response.status_code == 429:
+            self.rate_limited += 1
+            self._pause(parse_duration(headers.get("retry-after"))
+                        or parse_duration(headers.get("x-ratelimit-reset-tokens")) or 1.0)
+
+    def _pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self):
+        return {
+            "queued": sum(1 for *_, future in self._queue if not future.done()),
+            "granted": self.granted,
+            "rate_limited": self.rate_limited,
+            "avg_wait_s": round(self.total_wait / self.granted, 3) if self.granted else 0.0,
+            "max_wait_s": round(self.max_wait, 3),
+            "paused_for_s": round(max(self.paused_until - time.monotonic(), 0), 3),
+            "requests_available": round(self.requests.level, 1),
+            "tokens_available": round(self.tokens.level),
+            "tpm": self.tokens.capacity,
+        }
+
+
+class LLMScheduler:
+    """Central gate for every Groq call of the app.
+
+    Calls wait in a priority queue until the model's request and token
+    buckets allow them, so bursts are spread over the minute instead of
+    failing and retrying together. Prompt sizes are estimated up front and
+    settled with the reported usage, and the rate-limit headers of every
+    response (seen through the shared HTTP client) keep the buckets in line
+    with the provider.
+    """
+
+    def __init__(self):
+        self._limiters = {}
+        self._clients = {}
+
+    def limiter(self, model: str) -> RateLimiter:
+        if model not in self._limiters:
+            self._limiters[model] = RateLimiter(model)
+        return self._limiters[model]
+
+    def http_client(self, model: str) -> httpx.AsyncClient:
+        """Pass as ``http_async_client`` to ChatGroq so the headers are observed."""
+        if model not in self._clients:
+            limiter = self.limiter(model)
+
+            async def on_response(response: httpx.Response):
+                limiter.observe(response)
+
+            self._clients[model] = httpx.AsyncClient(event_hooks={"response": [on_response]})
+        return self._clients[model]
+
+    async def invoke(self, runnable, input, *, model: str, priority: int = PRIORITY_INTERACTIVE):
+        limiter = self.limiter(model)
+        estimated = estimate_tokens(runnable, input) + LLM_COMPLETION_TOKENS_ESTIMATE
+        waited = await limiter.acquire(priority, estimated)
+        if waited > 1:
+            print(f"⏳ {model} call waited {waited:.1f}s for the rate limit")
+
+        response = await runnable.ainvoke(input)
+
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            limiter.settle(estimated, usage["total_tokens"])
+        return response
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def stats(self):
+        return {model: limiter.stats() for model, limiter in self._limiters.items()}
+
+
+llm_scheduler = LLMScheduler()
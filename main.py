@@ -7,21 +7,47 @@ from agents import router as agents_router
 from conversations import router as conversations_router
 from files import router as files_router
 from fastapi.middleware.cors import CORSMiddleware
-from persistDB import init_db
-import asyncio
+from persistDB import init_db, engine_pool_stats, async_engine
+import asyncio, time
 from langchain_mcp_adapters.client import MultiServerMCPClient
 # from get_tools_list import load_tools
 from users import router as auth_router
+from checkpointer import open_checkpointer, close_checkpointer, pool_health
+from tool_catalog import tool_catalog
+from test_mcp_1 import mcp_sessions
+from checkpoint_compaction import CheckpointCompactor
+from token_ledger import token_ledger
+from answer_cache import answer_cache
+from agent_cache import agent_cache
+from llm_scheduler import llm_scheduler
+from tool_executor import tool_call_stats
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("App startup: creating DB tables...")
-    # create_db_and_tables()
-    await init_db()
+    print("App startup: checking DB tables...")
+    started = time.perf_counter()
+    app.state.schema_report = await init_db()
 
+    app.state.checkpointer_pool, app.state.checkpointer = await open_checkpointer()
+    await tool_catalog.start()
+    app.state.compactor = CheckpointCompactor(app.state.checkpointer_pool)
+    app.state.compactor.start()
+    token_ledger.start()
+    await agent_cache.start()
+    app.state.startup_ms = round(1000 * (time.perf_counter() - started), 1)
+    print(f"🚀 Startup finished in {app.state.startup_ms} ms")
 
     yield
     print("App shutdown: cleanup logic if needed.")
+    await app.state.compactor.stop()
+    await agent_cache.stop()
+    # last flush of buffered token usage before the engine goes away
+    await token_ledger.stop()
+    await tool_catalog.stop()
+    await mcp_sessions.close()
+    await llm_scheduler.close()
+    await close_checkpointer(app.state.checkpointer_pool)
+    await async_engine.dispose()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -47,3 +73,56 @@ app.include_router(agents_router, prefix="/agents", tags=["Agents"])
 app.include_router(auth_router, prefix="/auth", tags=["Users"])
 app.include_router(conversations_router, prefix="/conversations", tags=["Conversations"])
 app.include_router(files_router, prefix="/conversations", tags=["Files"])
+
+
+@app.get("/health/checkpointer", tags=["Health"], description="Connection pool health of the shared checkpointer.")
+async def checkpointer_health():
+    return pool_health(app.state.checkpointer_pool)
+
+
+@app.get("/health/db", tags=["Health"],
+         description="Connection pool usage of the application database engine and the startup schema check.")
+async def db_health():
+    return {**engine_pool_stats(), "schema": app.state.schema_report, "startup_ms": app.state.startup_ms}
+
+
+@app.get("/tools", tags=["Tools"], description="Status of the cached MCP tool catalog.")
+async def tools_status():
+    return tool_catalog.status()
+
+
+@app.post("/tools/refresh", tags=["Tools"], description="Re-fetch the MCP tool catalog now.")
+async def refresh_tools():
+    await tool_catalog.invalidate()
+    return tool_catalog.status()
+
+
+@app.get("/health/mcp", tags=["Health"], description="Pooled MCP sessions per server and tool call counters.")
+async def mcp_health():
+    return {**mcp_sessions.stats(), "tool_calls": tool_call_stats}
+
+
+@app.get("/health/answer-cache", tags=["Health"], description="Hit and miss counters of the answer cache.")
+async def answer_cache_health():
+    return answer_cache.stats()
+
+
+@app.get("/health/agent-cache", tags=["Health"], description="Hit rate and invalidations of the agent config cache.")
+async def agent_cache_health():
+    return agent_cache.stats()
+
+
+@app.get("/health/llm", tags=["Health"], description="Rate-limit queue of the LLM calls, per model.")
+async def llm_health():
+    return llm_scheduler.stats()
+
+
+@app.get("/maintenance/checkpoints", tags=["Maintenance"], description="Report of the last checkpoint compaction.")
+async def checkpoint_compaction_report():
+    return app.state.compactor.last_report or {}
+
+
+@app.post("/maintenance/checkpoints/compact", tags=["Maintenance"],
+          description="Prune old checkpoints and orphaned threads now.")
+async def compact_checkpoints():
+    return await app.state.compactor.run_once()
\ No newline at end of file
@@ -0,0 +1,153 @@
+import asyncio, json, logging, os, sqlite3, time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PUBMED_CACHE_MAX_ENTRIES = int(os.getenv("PUBMED_CACHE_MAX_ENTRIES", "512"))
+# results younger than the TTL are served as is
+PUBMED_CACHE_TTL_SECONDS = float(os.getenv("PUBMED_CACHE_TTL_SECONDS", "86400"))
+# after the TTL a result is still served for this long while it's refreshed in the background
+PUBMED_CACHE_STALE_SECONDS = float(os.getenv("PUBMED_CACHE_STALE_SECONDS", "604800"))
+# SQLite file of the on-disk tier, empty keeps the cache in memory only
+PUBMED_CACHE_PATH = os.getenv("PUBMED_CACHE_PATH", "pubmed_cache.db")
+# expired results are deleted from the disk tier every this many writes
+PUBMED_CACHE_PRUNE_EVERY = int(os.getenv("PUBMED_CACHE_PRUNE_EVERY", "200"))
+
+
+def cache_key(term: str, mindate, maxdate, retmax, sort) -> str:
+    return json.dumps([term.strip(), mindate, maxdate, retmax, sort])
+
+
+class DiskTier:
+    """SQLite table of JSON results, it survives restarts of the MCP server."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute(
+            "create table if not exists search_cache ("
+            "key text primary key, value text not null, stored_at real not null)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str):
+        row = self._conn.execute(
+            "select value, stored_at from search_cache where key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def put(self, key: str, value, stored_at: float):
+        self._conn.execute(
+            "insert or replace into search_cache (key, value, stored_at) values (?, ?, ?)",
+            (key, json.dumps(value), stored_at),
+        )
+        self._conn.commit()
+
+    def prune(self, older_than: float):
+        self._conn.execute("delete from search_cache where stored_at < ?", (older_than,))
+        self._conn.commit()
+
+
+class SearchCache:
+    """Two-tier cache of search results: a bounded in-memory LRU in front of
+    an optional SQLite tier.
+
+    A result younger than ``ttl`` is fresh. Up to ``stale`` seconds past the
+    TTL it is still returned, and one background fetch replaces it. Older
+    results are fetched again before answering.
+    """
+
+    def __init__(self, max_entries: int = PUBMED_CACHE_MAX_ENTRIES,
+                 ttl: float = PUBMED_CACHE_TTL_SECONDS,
+                 stale: float = PUBMED_CACHE_STALE_SECONDS,
+                 path: str = PUBMED_CACHE_PATH,
+                 prune_every: int = PUBMED_CACHE_PRUNE_EVERY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale = stale
+        self.prune_every = prune_every
+        self._writes = 0
+        self._memory = OrderedDict()    # key -> (value, stored_at)
+        self._disk = None
+        if path:
+            try:
+                self._disk = DiskTier(path)
+                self._disk.prune(time.time() - ttl - stale)
+            except sqlite3.Error as e:
+                logging.warning(f"PubMed cache disk tier disabled: {e}")
+        self._refreshing = {}
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0,
+                         "stale_served": 0, "refreshes": 0, "refresh_errors": 0}
+
+    def _remember(self, key: str, value, stored_at: float):
+        self._memory[key] = (value, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def _lookup(self, key: str):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return (*self._memory[key], "memory_hits")
+        if self._disk is not None:
+            try:
+                found = await asyncio.to_thread(self._disk.get, key)
+            except sqlite3.Error as e:
+                logging.warning(f"PubMed cache read failed: {e}")
+                found = None
+            if found is not None:
+                self._remember(key, *found)
+                return (*found, "disk_hits")
+        return None
+
+    async def _store(self, key: str, value):
+        stored_at = time.time()
+        self._remember(key, value, stored_at)
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._disk.put, key, value, stored_at)
+                self._writes += 1
+                # a long-running server would otherwise keep every result ever fetched
+                if self.prune_every and self._writes % self.prune_every == 0:
+                    await asyncio.to_thread(self._disk.prune, stored_at - self.ttl - self.stale)
+            except sqlite3.Error as e:
+                logging.warning(f"PubMed cache write failed: {e}")
+
+    async def _refresh(self, key: str, fetch):
+        try:
+            await self._store(key, await fetch())
+            self.counters["refreshes"] += 1
+        except Exception as e:
+            self.counters["refresh_errors"] += 1
+            logging.warning(f"PubMed cache refresh failed, keeping the stale result: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def get_or_fetch(self, key: str, fetch):
+        """Cached result for ``key``, ``fetch`` is an async callable producing it."""
+        found = await self._lookup(key)
+        if found is not None:
+            value, stored_at, tier = found
+            age = time.time() - stored_at
+            if age < self.ttl:
+                self.counters[tier] += 1
+                return value
+            if age < self.ttl + self.stale:
+                self.counters[tier] += 1
+                self.counters["stale_served"] += 1
+                if key not in self._refreshing:
+                    self._refreshing[key] = asyncio.create_task(self._refresh(key, fetch))
+                return value
+
+        self.counters["misses"] += 1
+        value = await fetch()
+        await self._store(key, value)
+        return value
+
+    def stats(self):
+        return {**self.counters, "memory_entries": len(self._memory),
+                "disk": self._disk.path if self._disk is not None else None}
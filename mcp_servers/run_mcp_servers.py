@@ -2,8 +2,11 @@ import httpx, json, os, asyncio, logging
 from dotenv import load_dotenv
 from bs4 import BeautifulSoup
 from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 from pubmedclient.models import Db, EFetchRequest, ESearchRequest
 from pubmedclient.sdk import efetch, esearch, pubmedclient_client
+from pubmed.search_cache import SearchCache, cache_key
 from pydantic import BaseModel, Field
 from typing import Any, List, Dict, Optional, Literal
 
@@ -102,6 +105,14 @@ class SearchAbstractsRequest(BaseModel):
     )
 
 
+search_cache = SearchCache()
+
+
+@mcp.custom_route("/cache/stats", methods=["GET"])
+async def search_cache_stats(request: Request) -> JSONResponse:
+    return JSONResponse(search_cache.stats())
+
+
 @mcp.tool()
 async def search_abstracts(
     term: str,
@@ -113,8 +124,11 @@ async def search_abstracts(
     """Optimized: Search PubMed and return key info from top abstracts."""
     request = SearchAbstractsRequest(term=term, mindate=mindate, maxdate=maxdate, retmax=retmax,
                                      sort=sort)
+    key = cache_key(term, mindate, maxdate, retmax, sort)
+    return await search_cache.get_or_fetch(key, lambda: fetch_abstracts(request))
 
 
+async def fetch_abstracts(request: SearchAbstractsRequest) -> dict:
     async with pubmedclient_client() as client:
         search = await esearch(client, ESearchRequest(db=Db.PUBMED, **request.model_dump()))
         ids = search.esearchresult.idlist
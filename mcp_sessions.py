@@ -0,0 +1,212 @@
+import asyncio, os, time
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from langchain_mcp_adapters.sessions import create_session
+from langchain_mcp_adapters.tools import load_mcp_tools
+
+load_dotenv()
+
+MCP_MAX_SESSIONS_PER_SERVER = int(os.getenv("MCP_MAX_SESSIONS_PER_SERVER", "8"))
+MCP_SESSION_CONNECT_TIMEOUT = float(os.getenv("MCP_SESSION_CONNECT_TIMEOUT", "10"))
+# a restarted server doesn't know our session ids and the SDK never answers the
+# pending request, so idle sessions are pinged before reuse and calls have a deadline
+MCP_SESSION_PING_AFTER = float(os.getenv("MCP_SESSION_PING_AFTER", "15"))
+MCP_SESSION_PING_TIMEOUT = float(os.getenv("MCP_SESSION_PING_TIMEOUT", "2"))
+MCP_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "120"))
+
+
+class _LongLivedSession:
+    """One initialized MCP session, kept open by its own task.
+
+    The transport's context manager has to be entered and exited in the same
+    task, so the task holds it open until close() is called or the
+    connection dies (e.g. the server restarted).
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.session = None
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error = None
+        self._task = None
+        self.last_used = time.monotonic()
+
+    @property
+    def alive(self):
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def healthy(self):
+        if not self.alive:
+            return False
+        if time.monotonic() - self.last_used < MCP_SESSION_PING_AFTER:
+            return True
+        try:
+            await asyncio.wait_for(self.session.send_ping(), MCP_SESSION_PING_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    async def open(self):
+        self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._ready.wait(), MCP_SESSION_CONNECT_TIMEOUT)
+        if self._error is not None:
+            raise self._error
+        return self
+
+    async def _run(self):
+        try:
+            async with create_session(self.connection) as session:
+                await session.initialize()
+                self.session = session
+                self._ready.set()
+                await self._closing.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def close(self, timeout: float = 5):
+        self._closing.set()
+        if self._task is not None and not self._task.done():
+            try:
+                await asyncio.wait([self._task], timeout=timeout)
+            finally:
+                # also when we are cancelled while waiting, the transport must not outlive us
+                if not self._task.done():
+                    self._task.cancel()
+
+
+class MCPServerPool:
+    """Pool of long-lived sessions to a single MCP server.
+
+    At most ``max_sessions`` sessions exist at once, callers beyond that
+    wait for a free one. A session that fails a call is discarded and the
+    call is retried once on a fresh session, which is how a server restart
+    is absorbed without the caller noticing.
+    """
+
+    def __init__(self, name: str, connection, max_sessions: int = MCP_MAX_SESSIONS_PER_SERVER):
+        self.name = name
+        self.connection = connection
+        self.max_sessions = max_sessions
+        self._slots = asyncio.Semaphore(max_sessions)
+        self._idle = []
+        self._open = set()
+        self.reconnects = 0
+
+    async def _checkout(self):
+        while self._idle:
+            pooled = self._idle.pop()
+            if await pooled.healthy():
+                return pooled
+            await self._discard(pooled)
+        pooled = _LongLivedSession(self.connection)
+        try:
+            await pooled.open()
+        except BaseException:
+            # half-open (failed, timed out or cancelled setup), nothing to shut down cleanly
+            await pooled.close(timeout=0)
+            raise
+        self._open.add(pooled)
+        return pooled
+
+    async def _discard(self, pooled):
+        self._open.discard(pooled)
+        await pooled.close()
+
+    @asynccontextmanager
+    async def session(self):
+        async with self._slots:
+            pooled = await self._checkout()
+            reusable = False
+            try:
+                yield pooled.session
+                reusable = True
+            finally:
+                # a failed or cancelled call may have left a request pending on the session
+                if reusable:
+                    pooled.last_used = time.monotonic()
+                    self._idle.append(pooled)
+                else:
+                    await self._discard(pooled)
+
+    async def _run_until(self, call, deadline: float):
+        async def attempt():
+            async with self.session() as session:
+                return await call(session)
+
+        return await asyncio.wait_for(attempt(), max(deadline - time.monotonic(), 0))
+
+    async def run(self, call):
+        """Run ``call(session)`` on a pooled session, retrying once on a fresh one.
+
+        Both attempts, including waiting for a session, share one deadline.
+        """
+        deadline = time.monotonic() + MCP_CALL_TIMEOUT
+        try:
+            return await self._run_until(call, deadline)
+        except Exception as e:
+            if time.monotonic() >= deadline:
+                raise
+            self.reconnects += 1
+            print(f"🔌 MCP session to '{self.name}' failed ({e!r}), reconnecting.")
+            return await self._run_until(call, deadline)
+
+    async def close(self):
+        self._idle.clear()
+        for pooled in list(self._open):
+            await self._discard(pooled)
+
+    def stats(self):
+        return {
+            "open": len(self._open),
+            "idle": len(self._idle),
+            "max_sessions": self.max_sessions,
+            "reconnects": self.reconnects,
+        }
+
+
+class PooledSession:
+    """Stands in for a ClientSession in load_mcp_tools, so the LangChain tools
+    it builds borrow a pooled session per call instead of opening a new one."""
+
+    def __init__(self, pool: MCPServerPool):
+        self.pool = pool
+
+    async def list_tools(self):
+        return await self.pool.run(lambda session: session.list_tools())
+
+    async def call_tool(self, name, arguments):
+        return await self.pool.run(lambda session: session.call_tool(name, arguments))
+
+
+class MCPSessionManager:
+    """One MCPServerPool per configured server."""
+
+    def __init__(self, connections: dict, max_sessions: int = MCP_MAX_SESSIONS_PER_SERVER):
+        self.pools = {
+            name: MCPServerPool(name, connection, max_sessions)
+            for name, connection in connections.items()
+        }
+
+    async def get_tools(self):
+        """Tools of every reachable server, one server being down doesn't hide the others."""
+        all_tools, errors = [], []
+        for name, pool in self.pools.items():
+            try:
+                all_tools.extend(await load_mcp_tools(PooledSession(pool)))
+            except Exception as e:
+                print(f"⚠️ No tools from MCP server '{name}': {e}")
+                errors.append(e)
+        if errors and not all_tools:
+            raise errors[0]
+        return all_tools
+
+    async def close(self):
+        for pool in self.pools.values():
+            await pool.close()
+
+    def stats(self):
+        return {name: pool.stats() for name, pool in self.pools.items()}
@@ -0,0 +1,72 @@
+from typing import Optional
+
+# only the 'messages' channel blob of the latest checkpoint of a thread,
+# without building a graph or loading the other channels and pending writes
+LATEST_MESSAGES_SQL = """
+select bl.type, bl.blob
+from checkpoints c
+join checkpoint_blobs bl
+    on bl.thread_id = c.thread_id
+    and bl.checkpoint_ns = c.checkpoint_ns
+    and bl.channel = 'messages'
+    and bl.version = c.checkpoint -> 'channel_versions' ->> 'messages'
+where c.thread_id = %s and c.checkpoint_ns = ''
+order by c.checkpoint_id desc
+limit 1
+"""
+
+
+async def load_messages(checkpointer, thread_id: str) -> list:
+    async with checkpointer.conn.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(LATEST_MESSAGES_SQL, (thread_id,))
+            row = await cur.fetchone()
+
+    if row is None or row["type"] == "empty":
+        return []
+    return checkpointer.serde.loads_typed((row["type"], row["blob"]))
+
+
+def is_visible(message) -> bool:
+    """Messages the chat shows: no system prompts, tool results or empty tool-call turns."""
+    if message.type in ("system", "tool"):
+        return False
+    return bool(message.content)
+
+
+def project(index: int, message) -> dict:
+    content = message.content
+    if isinstance(content, list):
+        content = "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+    return {
+        "index": index,
+        "id": message.id,
+        "role": message.type,
+        "content": content,
+        "timestamp": message.additional_kwargs.get("timestamp"),
+    }
+
+
+def paginate(messages: list, limit: int, before: Optional[int] = None, after: Optional[int] = None) -> dict:
+    """One page of visible messages, oldest first.
+
+    The cursor is the message's position in the thread, which never changes
+    because the history is append-only. Without a cursor the latest page is
+    returned; ``before`` walks back in time, ``after`` forward.
+    """
+    visible = [(index, message) for index, message in enumerate(messages) if is_visible(message)]
+
+    if after is not None:
+        newer = [item for item in visible if item[0] > after]
+        page, has_more = newer[:limit], len(newer) > limit
+    else:
+        older = [item for item in visible if before is None or item[0] < before]
+        page, has_more = older[-limit:], len(older) > limit
+
+    items = [project(index, message) for index, message in page]
+    return {
+        "messages": items,
+        "has_more": has_more,
+        "next_before": items[0]["index"] if items else before,
+        "next_after": items[-1]["index"] if items else after,
+    }
@@ -0,0 +1,74 @@
+import os
+from typing import Optional
+from pydantic import BaseModel
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "llama-3.1-8b-instant")
+# tool selection is on the critical path of every turn, keep it on the fastest model
+ROUTER_MODEL = os.getenv("ROUTER_MODEL", DEFAULT_MODEL)
+ANSWER_MODEL = os.getenv("ANSWER_MODEL", DEFAULT_MODEL)
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", ROUTER_MODEL)
+# relevance grading runs before the answer on every graded turn, fast model too
+GRADER_MODEL = os.getenv("GRADER_MODEL", ROUTER_MODEL)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT")) if os.getenv("LLM_TIMEOUT") else None
+# "groq", or "fake" for the offline stand-in of fake_services.py
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+
+
+class NodeModel(BaseModel):
+    """Model settings of one graph node, unset fields use the defaults."""
+    model: Optional[str] = None
+    max_tokens: Optional[int] = None
+    timeout: Optional[float] = None
+
+
+class ModelRouting(BaseModel):
+    """Which model each LLM node of an agent's graph calls.
+
+    router: query_or_respond, decides on the tool calls.
+    answer: generate, writes the answer from the retrieved content.
+    summary: summarize_history, extends the rolling summary.
+    grader: grade_retrieval, drops the retrieved articles that aren't relevant.
+    """
+    router: NodeModel = NodeModel()
+    answer: NodeModel = NodeModel()
+    summary: NodeModel = NodeModel()
+    grader: NodeModel = NodeModel()
+
+    def resolved(self) -> "ModelRouting":
+        def fill(node: NodeModel, model: str) -> NodeModel:
+            return NodeModel(model=node.model or model,
+                             max_tokens=node.max_tokens,
+                             timeout=node.timeout if node.timeout is not None else LLM_TIMEOUT)
+
+        return ModelRouting(router=fill(self.router, ROUTER_MODEL),
+                            answer=fill(self.answer, ANSWER_MODEL),
+                            summary=fill(self.summary, SUMMARY_MODEL),
+                            grader=fill(self.grader, GRADER_MODEL))
+
+
+def routing_for(agent) -> ModelRouting:
+    # NULL (rows from before the column had a default) means no overrides
+    return ModelRouting.model_validate(agent.model_routing or {}).resolved()
+
+
+def chat_model(model: str, temperature: float = 0.1, max_tokens: Optional[int] = None,
+               timeout: Optional[float] = None):
+    """Chat model of the configured provider, every LLM of the app is built here."""
+    if LLM_PROVIDER == "fake":
+        from fake_services import FakeChatModel
+        return FakeChatModel(model=model)
+
+    from langchain_groq import ChatGroq
+    from llm_scheduler import llm_scheduler
+    return ChatGroq(
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout,
+        max_retries=2,
+        # the scheduler reads the rate-limit headers of every response
+        http_async_client=llm_scheduler.http_client(model),
+    )
@@ -1,10 +1,11 @@
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field, EmailStr
-from typing import Dict, List, Optional, Any
+from pydantic import BaseModel, Field, EmailStr, field_validator
+from typing import Dict, List, Optional, Any, Literal
 from datetime import datetime, timezone
 import uuid
 import random
 from sqlmodel import SQLModel
+from model_routing import ModelRouting
 
 # --------------------
 # Data Models
@@ -31,6 +32,11 @@ class Agent(BaseModel):
     welcomeMessage: str
     systemPrompt: str
     creativity: float
+    context_turns: int = 8
+    context_summary: bool = True
+    model_routing: ModelRouting = ModelRouting()
+    retrieval_mode: Literal["llm", "direct"] = "llm"
+    relevance_grading: bool = False
 
     
 
@@ -41,6 +47,17 @@ class AgentRead(BaseModel):
     welcomeMessage: str
     systemPrompt: str
     creativity: float
+    context_turns: int
+    context_summary: bool
+    model_routing: Optional[ModelRouting] = ModelRouting()
+    retrieval_mode: str
+    relevance_grading: bool
+
+    @field_validator("model_routing", mode="before")
+    @classmethod
+    def default_routing(cls, value):
+        # rows written before the column had a default hold NULL
+        return ModelRouting() if value is None else value
 
    
 
@@ -50,7 +67,39 @@ class AgentUpdate(BaseModel):
     welcomeMessage: Optional[str] = None
     systemPrompt: Optional[str] = None
     creativity: Optional[float] = None
+    context_turns: Optional[int] = None
+    context_summary: Optional[bool] = None
+    model_routing: Optional[ModelRouting] = None
+    retrieval_mode: Optional[Literal["llm", "direct"]] = None
+    relevance_grading: Optional[bool] = None
     
+
+
+class AgentImport(Agent):
+    # with upsert, a known id updates that agent
+    id: Optional[str] = None
+
+
+class AgentBulkRequest(BaseModel):
+    # rows are validated one by one, see AgentImport
+    agents: List[Dict[str, Any]]
+    upsert: bool = False
+    # write nothing when a single row is invalid
+    atomic: bool = False
+
+
+class AgentBulkError(BaseModel):
+    index: int
+    id: Optional[str] = None
+    errors: List[str]
+
+
+class AgentBulkResult(BaseModel):
+    created: List[str]
+    updated: List[str]
+    errors: List[AgentBulkError]
+
+
 # --------------------
 # Conversation Models
 # --------------------
@@ -78,12 +127,32 @@ class ConversationRead(BaseModel):
 
 
 
+class ConversationPage(BaseModel):
+    conversations: List[ConversationRead]
+    has_more: bool
+    next_cursor: Optional[str] = None
+
+
 class NewConversationRequest(BaseModel):
     agent_id: str = "68a896aa-65b3-459e-a419-30aa1aa2706e"
     title: str
     user_id: str
     
 
+class MessageRead(BaseModel):
+    index: int
+    id: Optional[str] = None
+    role: str
+    content: str
+    timestamp: Optional[datetime] = None
+
+
+class MessagePage(BaseModel):
+    messages: List[MessageRead]
+    has_more: bool
+    next_before: Optional[int] = None
+    next_after: Optional[int] = None
+
 
 
 
@@ -3,31 +3,98 @@ from sqlmodel import Field, Session, SQLModel, create_engine, select
 from sqlmodel import SQLModel
 from typing import Annotated
 from contextlib import contextmanager
-import os
+import os, time
 from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
+from schema_migrations import ensure_schema
 
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# engine settings, all overridable through the environment
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))               # connections kept open per worker
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))         # extra connections under bursts
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))       # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))       # reconnect connections older than this
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# prepared statements cached per asyncpg connection, 0 behind pgbouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# drop and recreate every table at startup, local development only
+DB_RESET = os.getenv("DB_RESET", "false").lower() in ("1", "true", "yes")
 
-async_engine = create_async_engine(DATABASE_URL, echo=True)
+
+pool_wait_stats = {"checkouts": 0, "timeouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            pool_wait_stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            pool_wait_stats["checkouts"] += 1
+            pool_wait_stats["wait_seconds_total"] += waited
+            pool_wait_stats["wait_seconds_max"] = max(pool_wait_stats["wait_seconds_max"], waited)
+
+
+def engine_options(url: str) -> dict:
+    options = {
+        "echo": DB_ECHO,
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if make_url(url).get_driver_name() == "asyncpg":
+        options["connect_args"] = {"statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    return options
+
+
+async_engine = create_async_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 
 async_session = sessionmaker(
     async_engine, class_=AsyncSession, expire_on_commit=False
 )
 
-# Optional: function to create tables
-async def init_db():
+async def init_db() -> dict:
+    """Bring the tables up to date with the models, without losing data.
+
+    Nothing runs but a fingerprint check when the models did not change.
+    DB_RESET=true restores the old drop-and-recreate for local development.
+    """
+    started = time.perf_counter()
     async with async_engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.drop_all)
-        await conn.run_sync(SQLModel.metadata.create_all)
+        if DB_RESET:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+            await conn.run_sync(SQLModel.metadata.create_all)
+            report = {"action": "reset"}
+        else:
+            report = await conn.run_sync(ensure_schema, SQLModel.metadata)
+    report["elapsed_ms"] = round(1000 * (time.perf_counter() - started), 1)
+
+    changes = {key: report[key] for key in ("created_tables", "added_columns", "backfilled", "created_indexes") if report.get(key)}
+    print(f"🗄️ Schema {report['action']} in {report['elapsed_ms']} ms {changes or ''}")
+    for warning in report.get("unmanaged", []):
+        print(f"⚠️ Schema: {warning}")
+    return report
 
 
 
@@ -36,4 +103,21 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
 
+def engine_pool_stats() -> dict:
+    """Pool usage of this worker, size the pool against the uvicorn worker count."""
+    pool = async_engine.pool
+    checkouts = pool_wait_stats["checkouts"]
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": checkouts,
+        "timeouts": pool_wait_stats["timeouts"],
+        "wait_ms_avg": round(1000 * pool_wait_stats["wait_seconds_total"] / checkouts, 3) if checkouts else 0.0,
+        "wait_ms_max": round(1000 * pool_wait_stats["wait_seconds_max"], 3),
+    }
+
+
 AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
@@ -0,0 +1,151 @@
+import json, os, re
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# tokens of retrieved content the generate prompt may carry
+GENERATE_CONTEXT_TOKENS = int(os.getenv("GENERATE_CONTEXT_TOKENS", "3000"))
+# the Llama tokenizers are close enough to cl100k for budgeting
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception as e:
+            print(f"⚠️ tiktoken unavailable ({e}), estimating tokens from the length.")
+            _encoding = False
+    if _encoding is False:
+        return len(text) // 4 + 1
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]{3,}", text.lower()))
+
+
+def _parse(content: str) -> list:
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        return [content] if content and content.strip() else []
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        return data["results"]
+    if isinstance(data, list):
+        return data
+    return [data]
+
+
+def recent_tool_messages(messages) -> list:
+    """Tool results of the current turn, in call order."""
+    start = len(messages)
+    while start > 0 and messages[start - 1].type == "tool":
+        start -= 1
+    return list(messages[start:])
+
+
+def last_question(messages) -> str:
+    return next((m.content for m in reversed(messages) if m.type == "human"), "")
+
+
+def documents_from(tool_messages) -> list:
+    """Articles (or plain text results) of the tool messages, in tool order.
+
+    MCP tools answer with one JSON text per item, or a single JSON object
+    holding a "results" list.
+    """
+    documents = []
+    for message in tool_messages:
+        parts = message.content if isinstance(message.content, list) else [message.content]
+        for part in parts:
+            if isinstance(part, dict):
+                part = part.get("text", "")
+            documents.extend(_parse(part))
+    return documents
+
+
+def _identities(document) -> set:
+    """Keys a document is known by, a duplicate shares at least one of them."""
+    if not isinstance(document, dict):
+        return {" ".join(str(document).lower().split())}
+    keys = {f"{key}:{document[key]}" for key in ("pmid", "doi") if document.get(key)}
+    if document.get("title"):
+        # same paper from PubMed and medRxiv: compare titles without punctuation or case
+        keys.add("title:" + " ".join(re.findall(r"\w+", str(document["title"]).lower())))
+    return keys or {json.dumps(document, sort_keys=True, default=str)}
+
+
+def unique_documents(documents) -> list:
+    seen, unique = set(), []
+    for document in documents:
+        identities = _identities(document)
+        if identities & seen:
+            continue
+        seen |= identities
+        unique.append(document)
+    return unique
+
+
+def render(document) -> str:
+    if not isinstance(document, dict):
+        return str(document).strip()
+    lines = [f"{key}: {value}" for key, value in document.items()
+             if value not in (None, "", [], {})]
+    return "\n".join(lines)
+
+
+def _relevance(question_words: set, document) -> float:
+    if not question_words:
+        return 0.0
+    if isinstance(document, dict):
+        title = _words(str(document.get("title", "")))
+        body = _words(render(document))
+    else:
+        title, body = set(), _words(str(document))
+    # title matches count double
+    return (len(question_words & body) + len(question_words & title)) / len(question_words)
+
+
+def assemble_context(tool_messages, question: str, budget: int = GENERATE_CONTEXT_TOKENS, exclude=()):
+    """Retrieved content for the generate prompt, within ``budget`` tokens.
+
+    Duplicates are dropped, as are the positions in ``exclude`` of the
+    deduplicated list (graded irrelevant). The rest is added in order of word
+    overlap with the question (tool order breaks ties); a document that
+    doesn't fit is skipped so a smaller one can still use the remaining
+    budget. Returns the text and a report of what was trimmed.
+    """
+    documents = documents_from(tool_messages)
+    unique = unique_documents(documents)
+    candidates = [(index, document) for index, document in enumerate(unique) if index not in exclude]
+
+    question_words = _words(question)
+    ranked = sorted(candidates, key=lambda item: (-_relevance(question_words, item[1]), item[0]))
+
+    parts, used, dropped, trimmed_tokens = [], 0, 0, 0
+    for _, document in ranked:
+        text = render(document)
+        tokens = count_tokens(text)
+        if used + tokens > budget:
+            dropped += 1
+            trimmed_tokens += tokens
+            continue
+        parts.append(text)
+        used += tokens
+
+    report = {
+        "documents": len(documents),
+        "duplicates": len(documents) - len(unique),
+        "irrelevant": len(unique) - len(candidates),
+        "included": len(parts),
+        "dropped": dropped,
+        "tokens": used,
+        "tokens_trimmed": trimmed_tokens,
+        "budget": budget,
+    }
+    return "\n\n".join(parts), report
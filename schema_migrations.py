@@ -0,0 +1,113 @@
+import hashlib, json
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, literal, select, text
+from sqlalchemy.schema import CreateColumn
+
+# any constant shared by all workers, it names the lock of the schema check
+SCHEMA_LOCK_KEY = 7218304517
+
+# kept out of SQLModel.metadata so it is not part of the fingerprint
+_version_metadata = MetaData()
+schema_version = Table(
+    "schema_version", _version_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("fingerprint", String(64), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+def schema_fingerprint(metadata) -> str:
+    """Hash of the tables, columns and indexes the models declare."""
+    tables = []
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        tables.append({
+            "name": table.name,
+            "columns": [[c.name, str(c.type), c.nullable, c.primary_key] for c in table.columns],
+            "indexes": sorted([index.name, [str(e) for e in index.expressions], index.unique]
+                              for index in table.indexes),
+        })
+    return hashlib.sha256(json.dumps(tables, sort_keys=True).encode()).hexdigest()
+
+
+def _add_column_ddl(table, column, dialect) -> str:
+    """ALTER TABLE for a new column, existing rows get its server or scalar default."""
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    ddl = f"ALTER TABLE {dialect.identifier_preparer.format_table(table)} ADD COLUMN "
+    if column.server_default is not None:
+        # CreateColumn renders the server default, the database fills the existing rows
+        return ddl + str(CreateColumn(column).compile(dialect=dialect))
+    if default is None:
+        # no value for the existing rows, the column has to accept NULL
+        return ddl + f"{dialect.identifier_preparer.format_column(column)} {column.type.compile(dialect)}"
+    rendered = literal(default, column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    ddl += str(CreateColumn(column).compile(dialect=dialect))
+    if " NOT NULL" in ddl:
+        return ddl.replace(" NOT NULL", f" DEFAULT {rendered} NOT NULL")
+    return ddl + f" DEFAULT {rendered}"
+
+
+def migrate(connection, metadata) -> dict:
+    """Create missing tables, columns and indexes, never drop anything.
+
+    NULLs in a NOT NULL column with a server default are filled with it.
+
+    Columns the models no longer declare are only reported, renames and
+    type changes need a hand-written migration.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    report = {"created_tables": [], "added_columns": [], "backfilled": [], "created_indexes": [], "unmanaged": []}
+
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            table.create(connection)
+            report["created_tables"].append(table.name)
+            continue
+
+        existing = {c["name"]: c for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                connection.execute(text(_add_column_ddl(table, column, connection.dialect)))
+                report["added_columns"].append(f"{table.name}.{column.name}")
+            elif column.server_default is not None and not column.nullable and existing[column.name]["nullable"]:
+                # added before it had a server default, e.g. by an older migration
+                backfilled = connection.execute(
+                    table.update().where(column.is_(None)).values({column.name: column.server_default.arg})
+                ).rowcount
+                if backfilled:
+                    report["backfilled"].append(f"{table.name}.{column.name}: {backfilled} rows")
+        for name in existing.keys() - set(table.columns.keys()):
+            report["unmanaged"].append(f"{table.name}.{name} is not declared by the model")
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
+                report["created_indexes"].append(index.name)
+    return report
+
+
+def ensure_schema(connection, metadata) -> dict:
+    """Skip the DDL when the stored fingerprint matches the models.
+
+    On PostgreSQL a transaction-scoped advisory lock serializes the workers
+    starting together: the first one migrates, the others wait, then find
+    the new fingerprint and skip.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+
+    schema_version.create(connection, checkfirst=True)
+    fingerprint = schema_fingerprint(metadata)
+    stored = connection.execute(select(schema_version.c.fingerprint).where(schema_version.c.id == 1)).scalar()
+    if stored == fingerprint:
+        return {"action": "unchanged", "fingerprint": fingerprint}
+
+    report = migrate(connection, metadata)
+    values = {"fingerprint": fingerprint, "applied_at": datetime.now(timezone.utc)}
+    if stored is None:
+        connection.execute(schema_version.insert().values(id=1, **values))
+    else:
+        connection.execute(schema_version.update().where(schema_version.c.id == 1).values(**values))
+    return {"action": "migrated", "fingerprint": fingerprint, "previous": stored, **report}
+
@@ -1,4 +1,5 @@
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Relationship, Column, JSON
+from sqlalchemy import Index, text
 from pydantic import EmailStr
 import uuid
 from typing import List, Optional
@@ -7,11 +8,23 @@ from datetime import datetime, timezone
 
 class AgentCreate(SQLModel, table=True):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
-    name: Optional[str]
+    # conversations look their agent up by name
+    name: Optional[str] = Field(index=True)
     description: Optional[str]
     welcomeMessage: Optional[str]
     systemPrompt: Optional[str]
     creativity: float = 0
+    # context policy: recent turns kept verbatim (0 = whole history), older ones summarized
+    context_turns: int = 8
+    context_summary: bool = True
+    # per-node model overrides, see model_routing.ModelRouting
+    # server default: rows written before the column existed read as {} too
+    model_routing: dict = Field(default_factory=dict,
+                                sa_column=Column(JSON, nullable=False, server_default=text("'{}'")))
+    # "llm": the LLM picks the tool calls, "direct": the question goes to every search tool
+    retrieval_mode: str = "llm"
+    # grade the retrieved articles and drop the irrelevant ones before generate
+    relevance_grading: bool = False
 
 # class User(SQLModel, table=True):
     
@@ -37,3 +50,9 @@ class ConversationCreate(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
 
     user: Optional["User"] = Relationship(back_populates="conversations")
+
+
+# per-user listing, newest first: served from the index without a sort,
+# id breaks ties between conversations created in the same instant
+Index("ix_conversationcreate_user_id_created_at_id",
+      ConversationCreate.user_id, ConversationCreate.created_at.desc(), ConversationCreate.id.desc())
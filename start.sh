@@ -1,8 +1,12 @@
 #!/bin/bash
 # start.sh
 
-# Start MCP servers in the background
-python mcp_servers\run_mcp_servers.py &
+# Start MCP servers in the background, FAKE_MCP=1 serves canned results offline
+if [ "$FAKE_MCP" = "1" ]; then
+    python fake_services.py &
+else
+    python mcp_servers\run_mcp_servers.py &
+fi
 
 # Start FastAPI app
 uvicorn main:app --host 0.0.0.0 --port=8000 --reload
\ No newline at end of file
@@ -1,49 +1,73 @@
 from langchain_mcp_adapters.client import MultiServerMCPClient, ClientSession
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.prebuilt import ToolNode, tools_condition
-import  os, asyncio
+import  os, asyncio, time
 import httpx
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_groq import ChatGroq
-from langchain_core.messages import AIMessage
+from langchain_core.messages import AIMessage, AIMessageChunk
 from dotenv import load_dotenv
 from langchain_core.tools import tool
 from langgraph.graph import StateGraph, END
 from datetime import datetime, timezone
 from langgraph.types import Command, interrupt
 from groq import NotFoundError
+from mcp_sessions import MCPSessionManager
+from tool_executor import concurrent_tool_node
+from context_policy import ContextPolicy, build_context, pending_summary_range, format_transcript
+from llm_scheduler import llm_scheduler, PRIORITY_BACKGROUND
+from model_routing import ModelRouting, NodeModel, DEFAULT_MODEL, chat_model
+from retrieval_context import assemble_context, documents_from, unique_documents, render, recent_tool_messages, last_question
+from content_grader import batch_grader_for, grade_documents
+from direct_retrieval import retrieval_tools, rewrite_query, direct_tool_calls
 
 
 # print(tools_list)
 load_dotenv()
 
-os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
+if os.getenv("GROQ_API_KEY"):
+    os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
 
-llm = ChatGroq(
-    model="llama-3.1-8b-instant",
-    temperature=0.1,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-    )
+llm = chat_model(DEFAULT_MODEL, temperature=0.1)
 
 client = MultiServerMCPClient(
     {
         "pubmed": {
             "command": "python",
             # Make sure to update to the full absolute path to your math_server.py file
-            "url":"http://localhost:8001/mcp",
+            "url": os.getenv("MCP_PUBMED_URL", "http://localhost:8001/mcp"),
             "transport": 'streamable_http',
         },
         "medRxiv": {
             "command": "python",
             # Make sure to update to the full absolute path to your math_server.py file
-            "url":"http://localhost:8002/mcp",
+            "url": os.getenv("MCP_MEDRXIV_URL", "http://localhost:8002/mcp"),
             "transport": 'streamable_http',
         }
     }
 )
 
+# long-lived, pooled sessions per MCP server, tools built from it reuse them
+mcp_sessions = MCPSessionManager(client.connections)
+
+
+
+# conversation state: messages plus the rolling summary of turns that
+# fell out of the context window, see context_policy.py
+class ConversationState(MessagesState):
+    summary: str
+    summarized_upto: int
+    # relevance grading of the current turn's articles: message count when
+    # graded, the positions of the dropped ones and the grader model, see grade_retrieval
+    graded: dict
+
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and a "
+    "biomedical literature assistant. Extend the current summary with the new "
+    "lines. Keep the user's questions, key findings and sources, and any "
+    "preferences the user stated. Stay under 200 words."
+)
 
 
 @tool
@@ -53,34 +77,46 @@ def human_assistance(query: str) -> str:
     return human_response["data"]
 
 
-# a function to create graph for each conversation
-async def create_graph(checkpointer,
-                       convo_db_name:str,
-                    #    tools_list,
-                       creativity:float = 0.1):
-
+# fetching the MCP tools, an empty list means the servers are unreachable
+async def load_tools():
     try:
-        tools_list = await client.get_tools()
+        return await mcp_sessions.get_tools()
 
     except httpx.ConnectError:
         print("Unable to connect to the MCP server. Please make sure it is running.")
-        tools_list = []
     except httpx.HTTPStatusError as e:
         print(f"Server returned an error: {e.response.status_code} - {e.response.text}")
-        tools_list = []
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        tools_list = []
-    
-    llm = ChatGroq(
-        model="llama-3.1-8b-instant",
-        temperature=creativity,
-        max_tokens=None,
-        timeout=None,
-        max_retries=2,
-    )
+    return []
+
+
+# a function to create graph for each conversation
+async def create_graph(checkpointer,
+                       convo_db_name:str,
+                       creativity:float = 0.1,
+                       tools_list = None,
+                       routing: ModelRouting = None,
+                       context_policy: ContextPolicy = None,
+                       retrieval_mode: str = "llm",
+                       relevance_grading: bool = False):
+
+    if tools_list is None:
+        tools_list = await load_tools()
+    routing = (routing or ModelRouting()).resolved()
+
+    def node_model(node: NodeModel):
+        return chat_model(node.model, temperature=creativity, max_tokens=node.max_tokens, timeout=node.timeout)
+
+    # small, fast model for tool selection, the answer model only where quality matters
+    router_llm = node_model(routing.router)
+    answer_llm = node_model(routing.answer)
+    summary_llm = node_model(routing.summary)
+    # grading wants stable verdicts, not the agent's creativity
+    grader = batch_grader_for(chat_model(routing.grader.model, temperature=0.1,
+                                         max_tokens=routing.grader.max_tokens, timeout=routing.grader.timeout))
 
-    async def query_or_respond(state: MessagesState):
+    async def query_or_respond(state: ConversationState):
         """Generate tool call for retrieval or respond."""
         
         # # Define your system message
@@ -93,18 +129,26 @@ async def create_graph(checkpointer,
         # # Prepend the system message to the user's message history
         # messages = [system_message] + state["messages"]
 
-        llm_with_tools = llm.bind_tools(tools_list)
+        llm_with_tools = router_llm.bind_tools(tools_list)
         
         
         try:
             # Try getting a response from the LLM
-            response = await llm_with_tools.ainvoke(state["messages"])
+            context = build_context(state["messages"], state.get("summary", ""), context_policy,
+                                    state.get("summarized_upto", 0))
+            started = time.perf_counter()
+            response = await llm_scheduler.invoke(llm_with_tools, context, model=routing.router.model)
             
             response_with_ts = AIMessage(
                 content=response.content,
+                tool_calls=response.tool_calls,
+                response_metadata=response.response_metadata,
+                usage_metadata=response.usage_metadata,
                 additional_kwargs={
                     "timestamp": datetime.now(timezone.utc),
-                    "tokens_usage": response.response_metadata
+                    "tokens_usage": response.response_metadata,
+                    "model": routing.router.model,
+                    "latency_ms": round((time.perf_counter() - started) * 1000),
                 }
             )
             return {"messages": [response_with_ts]}
@@ -129,24 +173,46 @@ async def create_graph(checkpointer,
             return {"messages": [error_message]}
 
     
-    # Step 2: Execute the retrieval.
-    mcp_tool_nodes = ToolNode(tools_list, name="mcp_tools")
+    # Step 1 (direct retrieval mode): the question goes to the search tools as
+    # is, without asking the LLM which tools to call.
+    direct_tools = retrieval_tools(tools_list) if retrieval_mode == "direct" else {}
+    if retrieval_mode == "direct" and not direct_tools:
+        print("⚠️ No search tools available for direct retrieval, using the LLM to pick tools.")
+
+    async def direct_retrieval(state: ConversationState):
+        """Call every search tool with the (rewritten) question."""
+        return {"messages": [direct_tool_calls(direct_tools, rewrite_query(state["messages"]))]}
+
+    # Step 2: Execute the retrieval, all tool calls of the turn run concurrently.
+    mcp_tool_nodes = concurrent_tool_node(tools_list)
+
+    # Step 2b (optional): drop the retrieved articles that aren't relevant to the question.
+    async def grade_retrieval(state: ConversationState):
+        """Grade every retrieved article against the question, within a deadline."""
+        documents = unique_documents(documents_from(recent_tool_messages(state["messages"])))
+        if not documents:
+            return {}
+        verdicts = await grade_documents(last_question(state["messages"]), [render(d) for d in documents],
+                                         grader=grader, model=routing.grader.model)
+        dropped = [index for index, relevant in enumerate(verdicts) if not relevant]
+        return {"graded": {"upto": len(state["messages"]), "dropped": dropped, "model": routing.grader.model}}
 
     # Step 3: Generate a response using the retrieved content.
-    async def generate(state: MessagesState):
+    async def generate(state: ConversationState):
         """Generate answer."""
 
         # Get generated ToolMessages
-        recent_tool_messages = []
-        for message in reversed(state["messages"]):
-            if message.type == "tool":
-                recent_tool_messages.append(message)
-            else:
-                break
-        tool_messages = recent_tool_messages[::-1]
-        # Format into prompt
-        
-        docs_content = "\n\n".join(doc.content for doc in tool_messages)
+        tool_messages = recent_tool_messages(state["messages"])
+        question = last_question(state["messages"])
+
+        # articles graded irrelevant in this turn
+        graded = state.get("graded") or {}
+        dropped = set(graded.get("dropped", [])) if graded.get("upto") == len(state["messages"]) else set()
+
+        # Format into prompt: deduplicated, most relevant first, within the token budget
+        docs_content, context_report = assemble_context(tool_messages, question, exclude=dropped)
+        if context_report["dropped"] or context_report["duplicates"] or context_report["irrelevant"]:
+            print(f"✂️ Retrieved context trimmed: {context_report}")
 
         system_message_content = (
             "You are an assistant for question-answering tasks. "
@@ -159,42 +225,80 @@ async def create_graph(checkpointer,
         )
         conversation_messages = [
             message
-            for message in state["messages"]
+            for message in build_context(state["messages"], state.get("summary", ""), context_policy,
+                                         state.get("summarized_upto", 0))
             if message.type in ("human", "system")
             or (message.type == "ai" and not message.tool_calls)
         ]
         prompt = [SystemMessage(system_message_content)] + conversation_messages
 
         # Run
-        llm_with_human_assistance = llm.bind_tools([human_assistance])
-        response = await llm_with_human_assistance.ainvoke(prompt)
+        llm_with_human_assistance = answer_llm.bind_tools([human_assistance])
+        started = time.perf_counter()
+        response = await llm_scheduler.invoke(llm_with_human_assistance, prompt, model=routing.answer.model)
+        response.additional_kwargs["timestamp"] = datetime.now(timezone.utc)
+        response.additional_kwargs["model"] = routing.answer.model
+        response.additional_kwargs["latency_ms"] = round((time.perf_counter() - started) * 1000)
+        response.additional_kwargs["context"] = context_report
         return {"messages": [response]}
     
     
+    # Step 4: Fold turns that left the context window into the rolling summary.
+    async def summarize_history(state: ConversationState):
+        """Extend the rolling summary, only when enough turns are waiting."""
+        pending = pending_summary_range(state["messages"], state.get("summarized_upto", 0), context_policy)
+        if pending is None:
+            return {}
+
+        start, end = pending
+        transcript = format_transcript(state["messages"][start:end])
+        try:
+            response = await llm_scheduler.invoke(summary_llm, [
+                SystemMessage(SUMMARY_PROMPT),
+                HumanMessage(f"Current summary:\n{state.get('summary') or '(none)'}\n\nNew lines:\n{transcript}"),
+            ], model=routing.summary.model, priority=PRIORITY_BACKGROUND)
+        except Exception as e:
+            # the turns stay pending and are retried after the next turn
+            print(f"Unable to update the conversation summary: {e}")
+            return {}
+        return {"summary": response.content, "summarized_upto": end}
+
     # defining human_assistant tool node
     human_assistance_tool_node = ToolNode([human_assistance], name="human_assistance")
 
 
-    graph_builder = StateGraph(MessagesState)
+    graph_builder = StateGraph(ConversationState)
 
     graph_builder.add_node(query_or_respond)
-    graph_builder.add_node(mcp_tool_nodes)
+    graph_builder.add_node("mcp_tools", mcp_tool_nodes)
     graph_builder.add_node(human_assistance_tool_node)
     graph_builder.add_node(generate)
+    graph_builder.add_node(summarize_history)
 
-    graph_builder.set_entry_point("query_or_respond")
+    if direct_tools:
+        graph_builder.add_node(direct_retrieval)
+        graph_builder.set_entry_point("direct_retrieval")
+        graph_builder.add_edge("direct_retrieval", "mcp_tools")
+    else:
+        graph_builder.set_entry_point("query_or_respond")
     graph_builder.add_conditional_edges(
         "query_or_respond",
         tools_condition,
-        {END: END, "mcp_tools": "mcp_tools"},
+        {END: "summarize_history", "tools": "mcp_tools"},
     )
-    graph_builder.add_edge("mcp_tools", "generate")
+    if relevance_grading:
+        graph_builder.add_node(grade_retrieval)
+        graph_builder.add_edge("mcp_tools", "grade_retrieval")
+        graph_builder.add_edge("grade_retrieval", "generate")
+    else:
+        graph_builder.add_edge("mcp_tools", "generate")
     graph_builder.add_conditional_edges(
         "generate",
         tools_condition,
-        {END: END, "human_assistance": "human_assistance"},
+        {END: "summarize_history", "tools": "human_assistance"},
     )
     graph_builder.add_edge("human_assistance", END)
+    graph_builder.add_edge("summarize_history", END)
     
 
     graph = graph_builder.compile(checkpointer=checkpointer)
@@ -202,14 +306,83 @@ async def create_graph(checkpointer,
     return graph
 
   
-# calling the memory-aware graph
+# calling the memory-aware graph, runs the whole turn and returns
+# the last update of every node, e.g. {"query_or_respond": ..., "generate": ...}
 async def stream_graph_updates(user_input: str, conv_config, graph):
 
+    updates = {}
     async for event in graph.astream({"messages": [("user", user_input)]},
                                         conv_config,
                                         # stream_mode="messages"
                                         ):
-        return event
+        updates.update(event)
+    return updates
+
+
+# (prompt_tokens, completion_tokens) of an AI message, streamed or not
+def message_token_usage(message):
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+    token_usage = (message.response_metadata.get("token_usage")
+                   or message.additional_kwargs.get("tokens_usage", {}).get("token_usage", {}))
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+
+# summed token usage of every AI message in a turn's node updates
+def turn_token_usage(updates: dict):
+    prompt_tokens = completion_tokens = 0
+    for update in updates.values():
+        if not isinstance(update, dict):
+            continue
+        for message in update.get("messages", []):
+            if message.type == "ai":
+                prompt, completion = message_token_usage(message)
+                prompt_tokens += prompt
+                completion_tokens += completion
+    return prompt_tokens, completion_tokens
+
+
+# streaming a turn for the SSE endpoint: yields (event, data) pairs.
+# "token" and "progress" go to the client, "update" carries the node's
+# messages so the caller can do its own accounting.
+async def astream_graph_events(user_input: str, conv_config, graph):
+    # with relevance grading, generate starts after grade_retrieval, not mcp_tools
+    grading = "grade_retrieval" in graph.nodes
+
+    async for mode, chunk in graph.astream({"messages": [("user", user_input)]},
+                                           conv_config,
+                                           stream_mode=["messages", "updates"]):
+        if mode == "messages":
+            message_chunk, metadata = chunk
+            node = metadata.get("langgraph_node")
+            # node outputs are re-emitted as full messages, only forward the chunks
+            if (node in ("query_or_respond", "generate")
+                    and isinstance(message_chunk, AIMessageChunk) and message_chunk.content):
+                yield "token", {"node": node, "content": message_chunk.content}
+            continue
+
+        for node, update in chunk.items():
+            if node == "__interrupt__":
+                yield "interrupt", {"values": [i.value for i in update]}
+                continue
+
+            messages = (update or {}).get("messages", [])
+            if node in ("query_or_respond", "direct_retrieval") and messages and messages[-1].tool_calls:
+                yield "progress", {"stage": "tool_call_started",
+                                   "tools": [call["name"] for call in messages[-1].tool_calls]}
+            elif node == "mcp_tools":
+                yield "progress", {"stage": "tool_finished",
+                                   "tools": [m.name for m in messages]}
+                if not grading:
+                    yield "progress", {"stage": "generating"}
+            elif node == "grade_retrieval":
+                if update:
+                    yield "progress", {"stage": "graded", "dropped": len(update["graded"]["dropped"])}
+                yield "progress", {"stage": "generating"}
+
+            yield "update", {"node": node, "messages": messages}
 
     # async for token, metadata in graph.astream({"messages": [("user", user_input)]},
     #                                     conv_config,
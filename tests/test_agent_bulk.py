@@ -0,0 +1,106 @@
+import asyncio, json, os, sqlite3
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("GROQ_API_KEY", "test")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+import agents, persistDB
+from sql_models import AgentCreate
+
+
+def agent(name, **extra):
+    return {"name": name, "description": "d", "welcomeMessage": "w", "systemPrompt": "s",
+            "creativity": 0.1, **extra}
+
+
+def make_client(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/app.db")
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+    asyncio.run(create())
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def session_override():
+        async with sessions() as session:
+            yield session
+
+    monkeypatch.setattr(agents, "async_session", sessions)
+    monkeypatch.setattr(agents, "AGENT_BULK_BATCH_SIZE", 2)
+    app = FastAPI()
+    app.include_router(agents.router, prefix="/agents")
+    app.dependency_overrides[persistDB.get_async_session] = session_override
+    return TestClient(app)
+
+
+def test_bulk_import_reports_invalid_rows_and_export_round_trips(tmp_path, monkeypatch):
+    client = make_client(tmp_path, monkeypatch)
+    rows = [agent("a", id="a"), agent("b", id="b"), {"name": "broken"}, agent("c", id="c", retrieval_mode="x"),
+            agent("a again", id="a"), agent("d")]
+
+    result = client.post("/agents/bulk", json={"agents": rows}).json()
+
+    assert result["created"][:2] == ["a", "b"] and len(result["created"]) == 3
+    assert [error["index"] for error in result["errors"]] == [2, 3, 4]
+    assert result["errors"][1]["errors"][0].startswith("retrieval_mode")
+
+    exported = [json.loads(line) for line in client.get("/agents/export").text.splitlines()]
+    assert sorted(row["name"] for row in exported) == ["a", "b", "d"]
+
+    for row in exported:
+        row["creativity"] = 0.9
+    result = client.post("/agents/bulk", json={"agents": exported, "upsert": True}).json()
+    assert len(result["updated"]) == 3 and not result["created"] and not result["errors"]
+    assert client.get("/agents/b").json()["creativity"] == 0.9
+
+
+def test_atomic_import_writes_nothing_on_an_invalid_row(tmp_path, monkeypatch):
+    client = make_client(tmp_path, monkeypatch)
+
+    response = client.post("/agents/bulk", json={"agents": [agent("a"), {"name": "broken"}], "atomic": True})
+
+    assert response.status_code == 422
+    assert client.get("/agents/export").text == ""
+
+
+def test_rows_created_concurrently_are_reported_or_updated(tmp_path, monkeypatch):
+    client = make_client(tmp_path, monkeypatch)
+    insert_new_agents = agents.insert_new_agents
+
+    def created_meanwhile(dialect_name):
+        # another request commits the same id between our select and our insert
+        with sqlite3.connect(tmp_path / "app.db") as conn:
+            conn.execute("INSERT INTO agentcreate (id, name, creativity, context_turns, context_summary, "
+                         "retrieval_mode, relevance_grading) VALUES ('b', 'other', 0.5, 8, 1, 'llm', 0)")
+        return insert_new_agents(dialect_name)
+
+    monkeypatch.setattr(agents, "insert_new_agents", created_meanwhile)
+    result = client.post("/agents/bulk", json={"agents": [agent("a", id="a"), agent("b", id="b")]}).json()
+    assert result["created"] == ["a"]
+    assert result["errors"] == [{"index": 1, "id": "b", "errors": ["id: agent already exists"]}]
+    assert client.get("/agents/b").json()["name"] == "other"
+
+    monkeypatch.setattr(agents, "insert_new_agents", insert_new_agents)
+    client.delete("/agents/b")
+    monkeypatch.setattr(agents, "insert_new_agents", created_meanwhile)
+    result = client.post("/agents/bulk", json={"agents": [agent("b", id="b")], "upsert": True}).json()
+    assert result == {"created": [], "updated": ["b"], "errors": []}
+    assert client.get("/agents/b").json()["name"] == "b"
+
+
+def test_upsert_invalidates_the_cached_agent_and_its_graphs(tmp_path, monkeypatch):
+    import graph_registry
+    client = make_client(tmp_path, monkeypatch)
+    client.post("/agents/bulk", json={"agents": [agent("a", id="a"), agent("b", id="b")]})
+    agents.agent_cache.put(AgentCreate(**client.get("/agents/a").json()))
+    monkeypatch.setitem(graph_registry._graphs, ("a", 0.1), "compiled graph")
+    monkeypatch.setitem(graph_registry._graphs, ("b", 0.1), "compiled graph")
+
+    client.post("/agents/bulk", json={"agents": [agent("a", id="a", creativity=0.9)], "upsert": True})
+
+    assert agents.agent_cache._cached("a") is None
+    assert list(graph_registry._graphs) == [("b", 0.1)]
+    assert client.get("/agents/a").json()["creativity"] == 0.9
@@ -0,0 +1,173 @@
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+from agent_cache import AgentCache
+from sql_models import AgentCreate
+
+
+def run_with_session(tmp_path, scenario):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/app.db")
+
+    async def run():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            session.add(AgentCreate(id="a1", name="medical agent", description=None, welcomeMessage=None,
+                                    systemPrompt="prompt", creativity=0.1))
+            await session.commit()
+            await scenario(session)
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_lookups_are_served_from_memory_after_the_first(tmp_path):
+    cache = AgentCache(notify=False)
+
+    async def scenario(session):
+        first = await cache.get(session, "a1")
+        first.systemPrompt = "changed by a caller"
+        by_name = await cache.get_by_name(session, "medical agent")
+
+        assert by_name.systemPrompt == "prompt"
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert await cache.get(session, "missing") is None
+
+    run_with_session(tmp_path, scenario)
+
+
+def test_write_through_replaces_the_entry_and_tells_subscribers(tmp_path):
+    cache = AgentCache(notify=False)
+    changed = []
+    cache.subscribe(changed.append)
+
+    async def scenario(session):
+        await cache.get_by_name(session, "medical agent")
+        agent = await session.get(AgentCreate, "a1")
+        agent.name, agent.creativity = "renamed", 0.7
+        await session.commit()
+        cache.changed(agent)
+
+        assert (await cache.get(session, "a1")).creativity == 0.7
+        assert cache.misses == 1
+        # the old name no longer maps to the agent
+        assert await cache.get_by_name(session, "medical agent") is None
+        assert changed == ["a1"]
+
+    run_with_session(tmp_path, scenario)
+
+
+class SlowSession:
+    """Loads the agent only when released, to race the load with an invalidation."""
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.release = asyncio.Event()
+
+    async def get(self, model, agent_id):
+        await self.release.wait()
+        return self.agent
+
+
+def test_a_load_racing_an_invalidation_is_not_cached():
+    cache = AgentCache(notify=False)
+    stale = AgentCreate(id="a1", name="medical agent", systemPrompt="old", creativity=0.1)
+
+    async def run():
+        session = SlowSession(stale)
+        load = asyncio.create_task(cache.get(session, "a1"))
+        await asyncio.sleep(0)
+        cache.invalidate("a1")          # committed by another request while we read
+        session.release.set()
+
+        assert (await load).systemPrompt == "old"
+        assert cache._cached("a1") is None
+
+    asyncio.run(run())
+
+
+class FakeNotification:
+    def __init__(self, payload):
+        self.payload = payload
+
+
+class FakeConnection:
+    def __init__(self, payloads, listening):
+        self.payloads = payloads
+        self.listening = listening
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql):
+        if self.listening:
+            self.listening.set()
+
+    async def notifies(self):
+        for payload in self.payloads:
+            yield FakeNotification(payload)
+        if self.listening is None:
+            raise ConnectionError("server closed the connection")
+        await asyncio.Event().wait()
+
+
+def listen_with(monkeypatch, cache, *sessions):
+    """Run the listener over one fake connection per session of notifications.
+
+    Every connection but the last drops after its notifications.
+    """
+    import psycopg
+    import agent_cache
+
+    monkeypatch.setattr(agent_cache, "AGENT_CACHE_RECONNECT_SECONDS", 0)
+
+    async def run():
+        listening = asyncio.Event()
+        connections = iter(enumerate(sessions, 1))
+
+        async def connect(conninfo, **kwargs):
+            number, payloads = next(connections)
+            return FakeConnection(payloads, listening if number == len(sessions) else None)
+
+        monkeypatch.setattr(psycopg.AsyncConnection, "connect", connect)
+        task = asyncio.create_task(cache._listen("postgresql://"))
+        await listening.wait()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+
+
+def test_own_notifications_are_skipped(monkeypatch):
+    cache = AgentCache(notify=True)
+    evicted = []
+    cache.subscribe(evicted.append)
+    cache.changed(AgentCreate(id="a1", name="medical agent", systemPrompt="prompt", creativity=0.1))
+    cache.changed(AgentCreate(id="a2", name="other agent", systemPrompt="prompt", creativity=0.1))
+    evicted.clear()
+
+    listen_with(monkeypatch, cache, [f"{cache.origin}:a1", "another-worker:a2"])
+
+    assert evicted == ["a2"]
+    assert cache.remote_invalidations == 1
+
+
+def test_reconnecting_clears_the_cache(monkeypatch):
+    cache = AgentCache(notify=True)
+    cache.changed(AgentCreate(id="a1", name="medical agent", systemPrompt="prompt", creativity=0.1))
+    generation = cache._generation
+
+    listen_with(monkeypatch, cache, ["another-worker:a2"])
+    assert cache._cached("a1") is not None
+    assert cache._generation == generation + 1
+
+    # the first connection drops, notifications may have been missed meanwhile
+    listen_with(monkeypatch, cache, [], [])
+    assert cache._cached("a1") is None and cache._ids_by_name == {}
+    assert cache._generation == generation + 2
@@ -0,0 +1,67 @@
+import time
+from answer_cache import AnswerCache, normalize
+
+
+def test_normalize_ignores_case_punctuation_and_spacing():
+    assert normalize("  What is  COVID-19? ") == normalize("what is covid 19")
+
+
+def test_exact_hit_and_miss():
+    cache = AnswerCache(threshold=1)
+    cache.put("agent", "What causes asthma?", "answer")
+
+    assert cache.get("agent", "what causes asthma") == "answer"
+    assert cache.get("agent", "what causes diabetes") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_exact_matching_is_the_default():
+    cache = AnswerCache()
+    cache.put("agent", "COVID-19 vaccine efficacy in older adults?", "answer")
+
+    assert cache.threshold == 1
+    assert cache.get("agent", "covid-19 vaccine efficacy in older adults, please") is None
+
+
+def test_near_duplicate_hit_when_enabled():
+    cache = AnswerCache(threshold=0.9)
+    cache.put("agent", "COVID-19 vaccine efficacy in older adults?", "answer")
+
+    assert cache.get("agent", "covid-19 vaccine efficacy in older adults, please") == "answer"
+    assert cache.get("agent", "side effects of ibuprofen") is None
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_questions_differing_by_one_entity_never_match():
+    # even with a lax threshold, the shingles of these pairs are 0.7 to 0.8 similar
+    cache = AnswerCache(threshold=0.5)
+    cache.put("agent", "hepatitis A vaccine schedule", "hepatitis A answer")
+    cache.put("agent", "side effects of vitamin D", "vitamin D answer")
+
+    assert cache.get("agent", "hepatitis B vaccine schedule") is None
+    assert cache.get("agent", "side effects of vitamin B12") is None
+    assert cache.get("agent", "vaccine schedule for hepatitis A") == "hepatitis A answer"
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_entries_are_scoped_per_agent():
+    cache = AnswerCache()
+    cache.put("a", "What causes asthma?", "answer")
+
+    assert cache.get("b", "What causes asthma?") is None
+    cache.evict_agent("a")
+    assert cache.get("a", "What causes asthma?") is None
+
+
+def test_ttl_and_lru_eviction():
+    cache = AnswerCache(max_entries=2, ttl=60)
+    cache.put("agent", "first question", "1")
+    cache.put("agent", "second question", "2")
+    cache.get("agent", "first question")
+    cache.put("agent", "third question", "3")
+
+    assert cache.get("agent", "second question") is None
+    assert cache.get("agent", "first question") == "1"
+
+    cache._entries[("agent", "first question")]["created_at"] = time.time() - 120
+    assert cache.get("agent", "first question") is None
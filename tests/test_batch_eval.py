@@ -0,0 +1,25 @@
+from batch_eval import percentile, summarize
+
+
+def test_percentile_interpolates():
+    values = [1, 2, 3, 4, 5]
+
+    assert percentile(values, 50) == 3
+    assert percentile(values, 100) == 5
+    assert percentile([], 95) == 0.0
+
+
+def test_summarize_skips_failed_questions_in_latency():
+    results = [
+        {"latency_s": 1.0, "error": None, "tool_errors": 0, "prompt_tokens": 10, "completion_tokens": 2,
+         "node_seconds": {"generate": 0.5}},
+        {"latency_s": 30.0, "error": "timed out after 30s", "tool_errors": 1, "prompt_tokens": 0,
+         "completion_tokens": 0, "node_seconds": {}},
+    ]
+
+    report = summarize(results, wall_seconds=2.0)
+
+    assert report["errors"] == 1
+    assert report["latency_p99_s"] == 1.0
+    assert report["questions_per_s"] == 1.0
+    assert report["node_p50_s"] == {"generate": 0.5}
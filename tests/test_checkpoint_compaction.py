@@ -0,0 +1,59 @@
+"""Runs against a real Postgres, set TEST_DB_URI (e.g. postgresql://postgres@localhost/test)."""
+import asyncio, os
+import pytest
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+TEST_DB_URI = os.getenv("TEST_DB_URI")
+pytestmark = pytest.mark.skipif(not TEST_DB_URI, reason="TEST_DB_URI not set")
+
+
+def test_old_checkpoints_go_and_the_latest_are_kept(monkeypatch):
+    import psycopg
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+    from langgraph.checkpoint.base import empty_checkpoint
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    import checkpoint_compaction
+    from checkpoint_compaction import CheckpointCompactor
+
+    async def existing(thread_ids):
+        return {"live"} & set(thread_ids)
+
+    monkeypatch.setattr(checkpoint_compaction, "existing_conversation_ids", existing)
+
+    async def run():
+        # a schema of its own: the compactor prunes every thread it can see
+        async with await psycopg.AsyncConnection.connect(TEST_DB_URI, autocommit=True) as conn:
+            await conn.execute("drop schema if exists compaction_test cascade")
+            await conn.execute("create schema compaction_test")
+        pool = AsyncConnectionPool(TEST_DB_URI, min_size=1, max_size=2, open=False,
+                                   kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row,
+                                           "options": "-c search_path=compaction_test"})
+        await pool.open()
+        saver = AsyncPostgresSaver(pool)
+        await saver.setup()
+
+        latest = {}
+        for thread_id in ("live", "orphan"):
+            config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+            for step in range(4):
+                checkpoint = empty_checkpoint()
+                config = await saver.aput(config, checkpoint, {"source": "loop", "step": step, "parents": {}}, {})
+                latest[thread_id] = checkpoint["id"]
+
+        report = await CheckpointCompactor(pool, keep_latest=2, batch_size=1, pause=0, min_idle=0).run_once()
+
+        kept = [c.config["configurable"]["checkpoint_id"]
+                async for c in saver.alist({"configurable": {"thread_id": "live"}})]
+        orphan = [c async for c in saver.alist({"configurable": {"thread_id": "orphan"}})]
+        # the compactor gave its batch connection back
+        stats = pool.get_stats()
+        await pool.close()
+        return report, kept, orphan, latest, stats
+
+    report, kept, orphan, latest, stats = asyncio.run(run())
+
+    assert len(kept) == 2 and kept[0] == latest["live"]
+    assert orphan == []
+    assert report["orphan_threads"] == 1 and report["checkpoints_deleted"] == 6
+    assert stats["pool_available"] == stats["pool_size"]
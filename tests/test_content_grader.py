@@ -0,0 +1,46 @@
+import asyncio, os
+os.environ.setdefault("GROQ_API_KEY", "test")
+import content_grader
+
+
+def run_grading(fake_batch, texts, **kwargs):
+    original = content_grader.grade_batch
+    content_grader.grade_batch = fake_batch
+    try:
+        return asyncio.run(content_grader.grade_documents("asthma", texts, **kwargs))
+    finally:
+        content_grader.grade_batch = original
+
+
+def test_batches_are_graded_and_merged_in_order():
+    async def fake_batch(question, texts, priority, grader, model):
+        return ["asthma" in text for text in texts]
+
+    texts = ["asthma in kids", "knee surgery", "asthma adults", "flu", "asthma"]
+
+    assert run_grading(fake_batch, texts, batch_size=2) == [True, False, True, False, True]
+
+
+def test_late_or_failed_batches_keep_their_articles():
+    async def fake_batch(question, texts, priority, grader, model):
+        if texts[0] == "slow":
+            await asyncio.sleep(5)
+        if texts[0] == "broken":
+            raise RuntimeError("grader down")
+        return [False] * len(texts)
+
+    texts = ["fast", "slow", "broken"]
+
+    assert run_grading(fake_batch, texts, batch_size=1, timeout=0.1) == [False, True, True]
+
+
+def test_batches_use_the_given_grader_model():
+    seen = set()
+
+    async def fake_batch(question, texts, priority, grader, model):
+        seen.add((grader, model))
+        return [True] * len(texts)
+
+    run_grading(fake_batch, ["a", "b", "c"], batch_size=2, grader="agent chain", model="llama-3.3-70b-versatile")
+
+    assert seen == {("agent chain", "llama-3.3-70b-versatile")}
@@ -0,0 +1,102 @@
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
+from context_policy import SUMMARY_BATCH_TURNS, ContextPolicy, build_context, pending_summary_range, window_start
+
+
+def make_history(turns):
+    messages = [SystemMessage("You are helpful.")]
+    for i in range(turns):
+        messages += [
+            HumanMessage(f"question {i}"),
+            AIMessage("", tool_calls=[{"name": "search_abstracts", "args": {"term": str(i)}, "id": f"call_{i}"}]),
+            ToolMessage(f"results {i}", tool_call_id=f"call_{i}"),
+            AIMessage(f"answer {i}"),
+        ]
+    return messages
+
+
+def test_build_context_keeps_last_turns_and_drops_old_tool_messages():
+    messages = make_history(5) + [HumanMessage("question 5")]
+
+    context = build_context(messages, "", ContextPolicy(max_turns=2, summarize=False))
+
+    assert context[0].content == "You are helpful."
+    assert [m.content for m in context if m.type == "human"] == ["question 4", "question 5"]
+    assert not any(m.type == "tool" for m in context)
+    assert not any(m.type == "ai" and m.tool_calls for m in context)
+
+
+def test_build_context_keeps_tool_messages_of_current_turn():
+    messages = make_history(3)
+
+    context = build_context(messages, "", ContextPolicy(max_turns=2, summarize=False))
+
+    assert [m.content for m in context if m.type == "tool"] == ["results 2"]
+
+
+def test_build_context_adds_summary_after_system_prompt():
+    messages = make_history(4)
+
+    context = build_context(messages, "User asked about asthma.", ContextPolicy(max_turns=1), summarized_upto=13)
+
+    assert context[0].content == "You are helpful."
+    assert "User asked about asthma." in context[1].content
+    assert context[2].content == "question 3"
+
+
+def test_build_context_without_policy_returns_full_history():
+    messages = make_history(3)
+
+    assert build_context(messages, "", None) == messages
+
+
+def test_context_size_stays_constant():
+    policy = ContextPolicy(max_turns=3, summarize=True)
+
+    sizes = set()
+    for turns in range(3, 30):
+        messages = make_history(turns)
+        sizes.add(len(build_context(messages, "summary", policy, window_start(messages, 3))))
+
+    assert len(sizes) == 1
+
+
+def test_window_start_with_zero_turns_keeps_everything_but_system_prompt():
+    assert window_start(make_history(4), 0) == 1
+
+
+def test_pending_summary_range_waits_for_a_batch_of_turns():
+    policy = ContextPolicy(max_turns=2, summarize=True)
+
+    # the next turn will keep question 2 and the new question
+    assert pending_summary_range(make_history(3), 0, policy) == (1, 9)
+    # already summarized up to the window
+    assert pending_summary_range(make_history(3), 9, policy) is None
+    # only one turn waiting, build_context still sends it verbatim
+    assert pending_summary_range(make_history(2), 0, policy) is None
+    context = build_context(make_history(2) + [HumanMessage("question 2")], "", policy, summarized_upto=0)
+    assert [m.content for m in context if m.type == "human"] == ["question 0", "question 1", "question 2"]
+
+
+def test_no_turn_goes_missing_between_window_and_summary():
+    policy = ContextPolicy(max_turns=2, summarize=True)
+    messages, summarized_upto, summarized = make_history(0), 0, set()
+
+    for turn in range(12):
+        messages = messages + [HumanMessage(f"question {turn}")]
+        context = build_context(messages, "summary", policy, summarized_upto)
+        in_context = {m.content for m in context if m.type == "human"}
+        asked = {f"question {i}" for i in range(turn + 1)}
+        assert asked == in_context | summarized, f"turn {turn} lost {asked - in_context - summarized}"
+
+        messages = messages + [AIMessage(f"answer {turn}")]
+        pending = pending_summary_range(messages, summarized_upto, policy)
+        if pending:
+            summarized |= {m.content for m in messages[pending[0]:pending[1]] if m.type == "human"}
+            summarized_upto = pending[1]
+        # the context stays bounded: the window plus the turns waiting for a summary
+        assert len(in_context) <= policy.max_turns + SUMMARY_BATCH_TURNS
+
+
+def test_pending_summary_range_disabled():
+    assert pending_summary_range(make_history(6), 0, ContextPolicy(max_turns=2, summarize=False)) is None
+    assert pending_summary_range(make_history(6), 0, ContextPolicy(max_turns=0, summarize=True)) is None
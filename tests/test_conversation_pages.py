@@ -0,0 +1,60 @@
+import asyncio, os
+from datetime import datetime, timedelta
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("GROQ_API_KEY", "test")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+import persistDB
+from conversations import router
+from sql_models import ConversationCreate, User
+
+
+def client_with_conversations(tmp_path, count):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/app.db")
+    created = datetime(2025, 1, 1)
+
+    async def seed():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        async with AsyncSession(engine) as session:
+            session.add(User(id="u1", user_name="u1", hashed_password="x"))
+            for i in range(count):
+                # pairs share a timestamp, the id keeps the order total
+                session.add(ConversationCreate(id=f"c{i:02d}", user_id="u1", agent_id="a", title=str(i),
+                                               created_at=created + timedelta(minutes=i // 2)))
+            session.add(ConversationCreate(id="other", user_id="u2", agent_id="a", title="x", created_at=created))
+            await session.commit()
+
+    asyncio.run(seed())
+
+    async def session_override():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(router, prefix="/conversations")
+    app.dependency_overrides[persistDB.get_async_session] = session_override
+    return TestClient(app)
+
+
+def test_cursor_pages_walk_every_conversation_once(tmp_path):
+    client = client_with_conversations(tmp_path, 11)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/conversations/u1/page", params=params).json()
+        seen += [c["id"] for c in page["conversations"]]
+        cursor = page["next_cursor"]
+        if not page["has_more"]:
+            assert cursor is None
+            break
+
+    assert seen == [f"c{i:02d}" for i in reversed(range(11))]
+
+
+def test_invalid_cursor_is_rejected(tmp_path):
+    client = client_with_conversations(tmp_path, 1)
+
+    assert client.get("/conversations/u1/page", params={"cursor": "nope"}).status_code == 400
@@ -0,0 +1,36 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.tools import tool
+from direct_retrieval import direct_tool_calls, retrieval_tools, rewrite_query
+
+
+@tool
+def search_abstracts(term: str, retmax: int = 7) -> str:
+    """Search PubMed."""
+    return term
+
+
+@tool
+def get_medrxiv_metadata(doi: str) -> str:
+    """Metadata of one preprint."""
+    return doi
+
+
+def test_rewrite_query_keeps_search_terms():
+    messages = [SystemMessage("sp"), HumanMessage("What is the efficacy of COVID-19 vaccines?")]
+
+    assert rewrite_query(messages) == "efficacy covid-19 vaccines"
+
+
+def test_short_follow_up_borrows_previous_terms():
+    messages = [HumanMessage("Treatments for asthma?"), AIMessage("Inhaled steroids."),
+                HumanMessage("and in children?")]
+
+    assert rewrite_query(messages) == "treatments asthma children"
+
+
+def test_only_configured_search_tools_are_called():
+    tools = retrieval_tools([search_abstracts, get_medrxiv_metadata])
+
+    message = direct_tool_calls(tools, "asthma")
+
+    assert [(call["name"], call["args"]) for call in message.tool_calls] == [("search_abstracts", {"term": "asthma"})]
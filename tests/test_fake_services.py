@@ -0,0 +1,45 @@
+import asyncio
+from typing import List
+from pydantic import BaseModel
+from langchain_core.tools import tool
+from fake_services import FakeChatModel, sample_latency
+
+
+class Verdict(BaseModel):
+    relevant: List[int]
+    binary_score: str
+
+
+@tool
+def search_abstracts(term: str) -> str:
+    """Search PubMed."""
+    return term
+
+
+def test_latency_specs():
+    assert sample_latency("fixed:250") == 0.25
+    assert 0.1 <= sample_latency("uniform:100:200") <= 0.2
+    assert sample_latency("normal:-500:1") == 0
+
+
+def test_new_question_calls_the_search_tools():
+    llm = FakeChatModel(latency="fixed:0").bind_tools([search_abstracts])
+    message = asyncio.run(llm.ainvoke([("user", "asthma in children")]))
+
+    assert message.tool_calls[0]["name"] == "search_abstracts"
+    assert message.tool_calls[0]["args"] == {"term": "asthma in children"}
+    assert message.usage_metadata["output_tokens"] > 0
+
+
+def test_structured_output_keeps_every_numbered_item():
+    llm = FakeChatModel(latency="fixed:0").with_structured_output(Verdict)
+    result = asyncio.run(llm.ainvoke("[1] first article\n\n[2] second article"))
+
+    assert result == Verdict(relevant=[1, 2], binary_score="yes")
+
+
+def test_answer_without_tools():
+    message = FakeChatModel(latency="fixed:0", completion_tokens=5).invoke([("user", "flu")])
+
+    assert not message.tool_calls
+    assert "flu" in message.content
@@ -0,0 +1,50 @@
+import asyncio, os
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("GROQ_API_KEY", "test")
+from langchain_core.messages import AIMessage, ToolMessage
+from test_mcp_1 import astream_graph_events
+
+
+class ReplayGraph:
+    """Replays node updates the way graph.astream(stream_mode=["messages", "updates"]) does."""
+
+    def __init__(self, updates):
+        self.updates = updates
+        self.nodes = {node: None for node, _ in updates}
+
+    async def astream(self, state, config, stream_mode):
+        for node, update in self.updates:
+            yield "updates", {node: update}
+
+
+def stages(updates):
+    async def run():
+        return [data["stage"] async for event, data in astream_graph_events("asthma", {}, ReplayGraph(updates))
+                if event == "progress"]
+
+    return asyncio.run(run())
+
+
+tool_call = {"messages": [AIMessage("", tool_calls=[{"name": "search", "args": {}, "id": "t1"}])]}
+tool_result = {"messages": [ToolMessage("abstracts", name="search", tool_call_id="t1")]}
+answer = {"messages": [AIMessage("answer")]}
+
+
+def test_generating_follows_the_tools_without_grading():
+    updates = [("query_or_respond", tool_call), ("mcp_tools", tool_result), ("generate", answer)]
+
+    assert stages(updates) == ["tool_call_started", "tool_finished", "generating"]
+
+
+def test_generating_follows_the_grade():
+    updates = [("query_or_respond", tool_call), ("mcp_tools", tool_result),
+               ("grade_retrieval", {"graded": {"upto": 3, "dropped": [0]}}), ("generate", answer)]
+
+    assert stages(updates) == ["tool_call_started", "tool_finished", "graded", "generating"]
+
+
+def test_generating_is_sent_when_there_was_nothing_to_grade():
+    updates = [("query_or_respond", tool_call), ("mcp_tools", tool_result),
+               ("grade_retrieval", None), ("generate", answer)]
+
+    assert stages(updates) == ["tool_call_started", "tool_finished", "generating"]
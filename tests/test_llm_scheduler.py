@@ -0,0 +1,45 @@
+import asyncio
+import httpx
+from llm_scheduler import LLMScheduler, TokenBucket, parse_duration
+
+
+class FakeRunnable:
+    kwargs = {}
+
+    async def ainvoke(self, input):
+        return input
+
+
+def test_parse_duration():
+    assert parse_duration("2m59.56s") == 179.56
+    assert parse_duration("120ms") == 0.12
+    assert parse_duration("3") == 3
+    assert parse_duration(None) == 0
+
+
+def test_queued_calls_run_by_priority():
+    async def run():
+        scheduler = LLMScheduler()
+        limiter = scheduler.limiter("model")
+        limiter.requests = TokenBucket(100, period=1)
+        limiter.requests.level = 0
+        order = []
+
+        async def call(priority):
+            await scheduler.invoke(FakeRunnable(), "question", model="model", priority=priority)
+            order.append(priority)
+
+        await asyncio.gather(call(2), call(1), call(0))
+        return order
+
+    assert asyncio.run(run()) == [0, 1, 2]
+
+
+def test_rate_limited_response_pauses_the_queue():
+    scheduler = LLMScheduler()
+    limiter = scheduler.limiter("model")
+
+    limiter.observe(httpx.Response(429, headers={"retry-after": "30"}))
+
+    assert limiter.rate_limited == 1
+    assert limiter.stats()["paused_for_s"] > 29
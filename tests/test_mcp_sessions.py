@@ -0,0 +1,111 @@
+import asyncio, time
+from contextlib import asynccontextmanager
+import pytest
+import mcp_sessions
+from mcp_sessions import MCPServerPool
+
+
+class FakeServer:
+    """Stands in for create_session, counts the transports still open."""
+
+    def __init__(self, initialize_delay=0.0):
+        self.initialize_delay = initialize_delay
+        self.open = 0
+        self.sessions = 0
+
+    @asynccontextmanager
+    async def create_session(self, connection):
+        self.open += 1
+        self.sessions += 1
+        try:
+            yield FakeSession(self.initialize_delay, self.sessions)
+        finally:
+            self.open -= 1
+
+
+class FakeSession:
+    def __init__(self, initialize_delay, number):
+        self.initialize_delay = initialize_delay
+        self.number = number
+
+    async def initialize(self):
+        await asyncio.sleep(self.initialize_delay)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeServer()
+    monkeypatch.setattr(mcp_sessions, "create_session", server.create_session)
+    return server
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_sessions_are_reused_and_closed(server):
+    pool = MCPServerPool("pubmed", {}, max_sessions=2)
+
+    async def run():
+        first = await pool.run(lambda session: asyncio.sleep(0, session.number))
+        second = await pool.run(lambda session: asyncio.sleep(0, session.number))
+        await pool.close()
+        await settle()
+        return first, second
+
+    assert asyncio.run(run()) == (1, 1)
+    assert server.open == 0
+
+
+def test_cancelled_setup_does_not_leak_the_session(server):
+    server.initialize_delay = 10
+    pool = MCPServerPool("pubmed", {})
+
+    async def run():
+        caller = asyncio.create_task(pool.run(lambda session: asyncio.sleep(0)))
+        await asyncio.sleep(0.01)
+        assert server.open == 1
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await settle()
+
+    asyncio.run(run())
+    assert server.open == 0 and pool.stats()["open"] == 0
+
+
+def test_cancelled_call_discards_its_session(server):
+    pool = MCPServerPool("pubmed", {})
+
+    async def run():
+        caller = asyncio.create_task(pool.run(lambda session: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await settle()
+
+    asyncio.run(run())
+    assert server.open == 0 and pool.stats()["open"] == pool.stats()["idle"] == 0
+
+
+def test_the_retry_shares_the_call_deadline(server, monkeypatch):
+    monkeypatch.setattr(mcp_sessions, "MCP_CALL_TIMEOUT", 0.3)
+    pool = MCPServerPool("pubmed", {})
+
+    async def call(session):
+        if session.number == 1:
+            await asyncio.sleep(0.2)
+            raise ConnectionError("server restarted")
+        await asyncio.sleep(10)
+
+    async def run():
+        started = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(call)
+        await settle()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 0.5
+    assert pool.reconnects == 1 and server.open == 0
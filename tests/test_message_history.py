@@ -0,0 +1,120 @@
+import asyncio
+from contextlib import asynccontextmanager
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from message_history import load_messages, paginate
+
+
+def conversation(turns):
+    """System prompt, then per turn a question, a tool call, its result and the answer."""
+    messages = [SystemMessage("prompt")]
+    for i in range(turns):
+        messages += [
+            HumanMessage(f"q{i}"),
+            AIMessage("", tool_calls=[{"name": "search", "args": {}, "id": f"t{i}"}]),
+            ToolMessage("abstracts", tool_call_id=f"t{i}"),
+            AIMessage(f"a{i}"),
+        ]
+    return messages
+
+
+def contents(page):
+    return [m["content"] for m in page["messages"]]
+
+
+def test_latest_page_without_cursor():
+    page = paginate(conversation(3), 4)
+
+    assert contents(page) == ["q1", "a1", "q2", "a2"]
+    assert page["has_more"]
+    assert page["next_before"] == 5 and page["next_after"] == 12
+
+
+def test_before_walks_back_to_the_first_message():
+    messages = conversation(3)
+    seen, before = [], None
+    while True:
+        page = paginate(messages, 2, before=before)
+        seen = contents(page) + seen
+        before = page["next_before"]
+        if not page["has_more"]:
+            break
+
+    assert seen == ["q0", "a0", "q1", "a1", "q2", "a2"]
+    # the last page is exactly full, there is nothing older
+    assert paginate(messages, 2, before=before) == {"messages": [], "has_more": False,
+                                                      "next_before": before, "next_after": None}
+
+
+def test_after_walks_forward_to_the_latest_message():
+    messages = conversation(3)
+    page = paginate(messages, 2, after=0)
+    assert contents(page) == ["q0", "a0"] and page["has_more"]
+
+    page = paginate(messages, 4, after=page["next_after"])
+    assert contents(page) == ["q1", "a1", "q2", "a2"]
+    assert not page["has_more"]
+
+    # polling for new messages keeps the cursor
+    page = paginate(messages, 4, after=page["next_after"])
+    assert page["messages"] == [] and not page["has_more"] and page["next_after"] == 12
+
+
+def test_has_more_at_the_edges():
+    messages = conversation(2)      # 4 visible messages
+
+    assert not paginate(messages, 4)["has_more"]
+    assert paginate(messages, 3)["has_more"]
+    assert not paginate(messages, 3, before=4)["has_more"]      # only q0 and a0 are older
+    assert not paginate(messages, 2, after=4)["has_more"]
+    assert paginate(messages, 1, after=4)["has_more"]
+
+
+def test_out_of_range_cursors():
+    messages = conversation(2)
+
+    assert contents(paginate(messages, 10, before=1000)) == ["q0", "a0", "q1", "a1"]
+    assert contents(paginate(messages, 10, after=-5)) == ["q0", "a0", "q1", "a1"]
+    assert paginate(messages, 10, before=0)["messages"] == []
+    assert paginate(messages, 10, before=-3)["next_before"] == -3
+    assert paginate(messages, 10, after=1000)["messages"] == []
+    assert paginate([], 10)["messages"] == [] and not paginate([], 10)["has_more"]
+
+
+class FakeCheckpointer:
+    def __init__(self, row):
+        self.serde = JsonPlusSerializer()
+        self.row = row
+        self.conn = self
+        self.params = None
+
+    @asynccontextmanager
+    async def connection(self):
+        yield self
+
+    @asynccontextmanager
+    async def cursor(self):
+        yield self
+
+    async def execute(self, sql, params):
+        self.params = params
+
+    async def fetchone(self):
+        return self.row
+
+
+def test_load_messages_decodes_the_messages_blob():
+    serde = JsonPlusSerializer()
+    type_, blob = serde.dumps_typed(conversation(1))
+    checkpointer = FakeCheckpointer({"type": type_, "blob": blob})
+
+    messages = asyncio.run(load_messages(checkpointer, "thread"))
+
+    assert checkpointer.params == ("thread",)
+    assert [m.content for m in messages][-1] == "a0"
+    assert contents(paginate(messages, 10)) == ["q0", "a0"]
+
+
+def test_load_messages_of_a_thread_without_messages():
+    assert asyncio.run(load_messages(FakeCheckpointer(None), "thread")) == []
+    assert asyncio.run(load_messages(FakeCheckpointer({"type": "empty", "blob": None}), "thread")) == []
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+from model_routing import ANSWER_MODEL, GRADER_MODEL, ROUTER_MODEL, SUMMARY_MODEL, ModelRouting, routing_for
+
+
+def test_unset_nodes_use_the_defaults():
+    routing = routing_for(SimpleNamespace(model_routing={}))
+
+    assert routing.router.model == ROUTER_MODEL
+    assert routing.answer.model == ANSWER_MODEL
+    assert routing.summary.model == SUMMARY_MODEL
+    assert routing.grader.model == GRADER_MODEL
+
+
+def test_agent_overrides_a_single_node():
+    agent = SimpleNamespace(model_routing={"answer": {"model": "llama-3.3-70b-versatile", "max_tokens": 512}})
+
+    routing = routing_for(agent)
+
+    assert routing.answer.model == "llama-3.3-70b-versatile"
+    assert routing.answer.max_tokens == 512
+    assert routing.router.model == ROUTER_MODEL
+
+
+def test_agent_picks_the_grader_model():
+    routing = routing_for(SimpleNamespace(model_routing={"grader": {"model": "llama-3.3-70b-versatile"}}))
+
+    assert routing.grader.model == "llama-3.3-70b-versatile"
+    assert routing.answer.model == ANSWER_MODEL
+
+
+def test_null_routing_reads_as_the_defaults():
+    from models import AgentRead
+
+    assert routing_for(SimpleNamespace(model_routing=None)).answer.model == ANSWER_MODEL
+    agent = AgentRead(id="a1", name="n", description="d", welcomeMessage="w", systemPrompt="s", creativity=0.1,
+                      context_turns=8, context_summary=True, model_routing=None,
+                      retrieval_mode="llm", relevance_grading=False)
+    assert agent.model_routing == ModelRouting()
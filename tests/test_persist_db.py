@@ -0,0 +1,36 @@
+import asyncio, os
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+import persistDB
+
+
+def test_statement_cache_only_for_asyncpg():
+    assert persistDB.engine_options("postgresql+asyncpg://u@h/db")["connect_args"] == {
+        "statement_cache_size": persistDB.DB_STATEMENT_CACHE_SIZE}
+    assert "connect_args" not in persistDB.engine_options("sqlite+aiosqlite:///x.db")
+    assert persistDB.engine_options("sqlite+aiosqlite:///x.db")["echo"] is False
+
+
+def test_pool_waits_and_timeouts_are_counted(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/pool.db", poolclass=persistDB.TimedQueuePool,
+                                 pool_size=1, max_overflow=0, pool_timeout=0.2)
+    before = dict(persistDB.pool_wait_stats)
+
+    async def hold():
+        async with engine.connect() as conn:
+            await conn.execute(text("select 1"))
+            await asyncio.sleep(0.4)
+
+    async def run():
+        results = await asyncio.gather(hold(), hold(), return_exceptions=True)
+        await engine.dispose()
+        return results
+
+    results = asyncio.run(run())
+
+    assert sum(isinstance(r, TimeoutError) for r in results) == 1
+    assert persistDB.pool_wait_stats["checkouts"] - before["checkouts"] == 2
+    assert persistDB.pool_wait_stats["timeouts"] - before["timeouts"] == 1
+    assert persistDB.pool_wait_stats["wait_seconds_max"] >= 0.2
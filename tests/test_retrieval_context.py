@@ -0,0 +1,44 @@
+import json
+from langchain_core.messages import ToolMessage
+from retrieval_context import assemble_context, count_tokens
+
+
+def pubmed_message(*articles):
+    return ToolMessage(json.dumps({"results": list(articles)}), tool_call_id="pubmed")
+
+
+def medrxiv_message(*articles):
+    return ToolMessage([json.dumps(article) for article in articles], tool_call_id="medrxiv")
+
+
+def test_duplicates_are_dropped_across_tools():
+    article = {"title": "Asthma in children.", "abstract": "Inhaled steroids help.", "pmid": "1"}
+    messages = [pubmed_message(article, article),
+                medrxiv_message({"title": "Asthma in Children", "abstract": "Inhaled steroids help."})]
+
+    text, report = assemble_context(messages, "asthma in children")
+
+    assert report["documents"] == 3
+    assert report["duplicates"] == 2
+    assert text.count("Inhaled steroids help.") == 1
+
+
+def test_most_relevant_documents_fill_the_budget():
+    relevant = {"title": "Vitamin D and asthma", "abstract": "Vitamin D lowers asthma attacks. " * 5, "pmid": "2"}
+    unrelated = {"title": "Knee surgery outcomes", "abstract": "Recovery after knee surgery. " * 5, "pmid": "3"}
+    budget = count_tokens("\n".join(f"{k}: {v}" for k, v in relevant.items())) + 5
+
+    text, report = assemble_context([pubmed_message(unrelated, relevant)], "does vitamin d help asthma", budget)
+
+    assert "Vitamin D and asthma" in text
+    assert "Knee surgery" not in text
+    assert report["dropped"] == 1
+    assert report["tokens"] <= budget
+    assert report["tokens_trimmed"] > 0
+
+
+def test_plain_text_results_are_kept():
+    text, report = assemble_context([ToolMessage("No results found", tool_call_id="nice")], "asthma")
+
+    assert text == "No results found"
+    assert report["included"] == 1
@@ -0,0 +1,73 @@
+from sqlalchemy import Boolean, Column, Index, Integer, MetaData, String, Table, create_engine, inspect, text
+from schema_migrations import ensure_schema
+
+
+def agents_table(metadata, *extra):
+    return Table("agent", metadata, Column("id", String, primary_key=True), Column("name", String), *extra)
+
+
+def test_additive_migration_keeps_rows_and_then_skips(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/app.db")
+    old = MetaData()
+    agents_table(old)
+    with engine.begin() as conn:
+        assert ensure_schema(conn, old)["created_tables"] == ["agent"]
+        conn.execute(text("INSERT INTO agent (id, name) VALUES ('a1', 'medical agent')"))
+
+    new = MetaData()
+    agents_table(new, Column("turns", Integer, nullable=False, default=8),
+                 Column("grading", Boolean, nullable=False, default=False),
+                 Column("notes", String), Index("ix_agent_name", "name"))
+    with engine.begin() as conn:
+        report = ensure_schema(conn, new)
+        assert report["action"] == "migrated"
+        assert report["added_columns"] == ["agent.turns", "agent.grading", "agent.notes"]
+        assert report["created_indexes"] == ["ix_agent_name"]
+        assert conn.execute(text("SELECT id, turns, grading, notes FROM agent")).all() == [("a1", 8, 0, None)]
+
+    with engine.begin() as conn:
+        assert ensure_schema(conn, new)["action"] == "unchanged"
+
+    # dropping a column from the model never drops it from the database
+    with engine.begin() as conn:
+        report = ensure_schema(conn, old)
+        assert sorted(report["unmanaged"]) == ["agent.grading is not declared by the model",
+                                               "agent.notes is not declared by the model",
+                                               "agent.turns is not declared by the model"]
+        assert {c["name"] for c in inspect(conn).get_columns("agent")} >= {"turns", "grading", "notes"}
+
+
+OLD_AGENT_TABLE = ('CREATE TABLE agentcreate (id VARCHAR PRIMARY KEY, name VARCHAR, description VARCHAR, '
+                   '"welcomeMessage" VARCHAR, "systemPrompt" VARCHAR, creativity FLOAT NOT NULL{extra})')
+
+
+def agents_after_migration(tmp_path, extra_columns="", row_values=""):
+    import sql_models
+    from sqlmodel import SQLModel
+    from models import AgentRead
+
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    with engine.begin() as conn:
+        conn.execute(text(OLD_AGENT_TABLE.format(extra=extra_columns)))
+        conn.execute(text(f"INSERT INTO agentcreate VALUES ('a1', 'medical agent', 'd', 'w', 's', 0.1{row_values})"))
+    with engine.begin() as conn:
+        report = ensure_schema(conn, SQLModel.metadata)
+    with engine.connect() as conn:
+        row = conn.execute(sql_models.AgentCreate.__table__.select()).mappings().one()
+    return report, sql_models.AgentCreate.model_validate(dict(row)), AgentRead
+
+
+def test_migrated_agents_of_an_old_table_are_readable(tmp_path):
+    report, agent, AgentRead = agents_after_migration(tmp_path)
+
+    assert "agentcreate.model_routing" in report["added_columns"]
+    read = AgentRead.model_validate(agent.model_dump())
+    assert (read.context_turns, read.retrieval_mode, read.relevance_grading) == (8, "llm", False)
+    assert agent.model_routing == {}
+
+
+def test_nulls_left_by_an_older_migration_are_backfilled(tmp_path):
+    report, agent, AgentRead = agents_after_migration(tmp_path, ", model_routing JSON", ", NULL")
+
+    assert report["backfilled"] == ["agentcreate.model_routing: 1 rows"]
+    assert agent.model_routing == {}
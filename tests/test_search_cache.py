@@ -0,0 +1,98 @@
+import asyncio, os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "mcp_servers", "pubmed"))
+import search_cache
+from search_cache import SearchCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+def make_cache(monkeypatch, path="", **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(search_cache.time, "time", clock.time)
+    return SearchCache(path=path, **kwargs), clock
+
+
+def counting_fetch(results):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return results[len(calls) - 1]
+
+    return fetch, calls
+
+
+def test_results_expire_after_ttl_and_stale_window(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=60, stale=30)
+    fetch, calls = counting_fetch(["first", "second"])
+
+    async def run():
+        assert await cache.get_or_fetch("k", fetch) == "first"
+        clock.now += 59
+        assert await cache.get_or_fetch("k", fetch) == "first"
+        # past ttl + stale: fetched again before answering
+        clock.now += 40
+        assert await cache.get_or_fetch("k", fetch) == "second"
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert cache.counters["misses"] == 2 and cache.counters["memory_hits"] == 1
+
+
+def test_stale_hits_trigger_one_background_refresh(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=60, stale=600)
+    fetch, calls = counting_fetch(["old", "new"])
+
+    async def run():
+        await cache.get_or_fetch("k", fetch)
+        clock.now += 120
+        # concurrent stale hits all get the old value, one refresh runs
+        served = await asyncio.gather(*(cache.get_or_fetch("k", fetch) for _ in range(5)))
+        await asyncio.gather(*cache._refreshing.values())
+        return served, await cache.get_or_fetch("k", fetch)
+
+    served, after = asyncio.run(run())
+    assert served == ["old"] * 5
+    assert after == "new"
+    assert len(calls) == 2
+    assert cache.counters["stale_served"] == 5 and cache.counters["refreshes"] == 1
+
+
+def test_disk_tier_serves_results_evicted_from_memory(monkeypatch, tmp_path):
+    cache, clock = make_cache(monkeypatch, path=str(tmp_path / "cache.db"), max_entries=1, ttl=60, stale=0)
+    fetch_a, calls_a = counting_fetch(["a"])
+    fetch_b, _ = counting_fetch(["b"])
+
+    async def run():
+        await cache.get_or_fetch("a", fetch_a)
+        await cache.get_or_fetch("b", fetch_b)     # evicts "a" from memory
+        assert "a" not in cache._memory
+        return await cache.get_or_fetch("a", fetch_a)
+
+    assert asyncio.run(run()) == "a"
+    assert len(calls_a) == 1 and cache.counters["disk_hits"] == 1
+
+    # a new process reads the same file
+    restarted = SearchCache(path=str(tmp_path / "cache.db"), ttl=60, stale=0)
+    assert asyncio.run(restarted.get_or_fetch("b", fetch_b)) == "b"
+    assert restarted.counters["disk_hits"] == 1
+
+
+def test_disk_tier_is_pruned_while_running(monkeypatch, tmp_path):
+    cache, clock = make_cache(monkeypatch, path=str(tmp_path / "cache.db"), ttl=60, stale=30, prune_every=2)
+
+    async def run():
+        await cache.get_or_fetch("old", counting_fetch(["old"])[0])
+        clock.now += 100                    # "old" is past ttl + stale
+        await cache.get_or_fetch("new", counting_fetch(["new"])[0])
+
+    asyncio.run(run())
+    assert cache._disk.get("old") is None
+    assert cache._disk.get("new")[0] == "new"
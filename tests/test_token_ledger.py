@@ -0,0 +1,107 @@
+import asyncio, os
+from datetime import datetime
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+import token_ledger
+from sql_models import ConversationCreate, User
+from token_ledger import TokenLedger
+
+
+def run_with_conversations(tmp_path, monkeypatch, scenario):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/app.db")
+    monkeypatch.setattr(token_ledger, "async_engine", engine)
+
+    async def stored():
+        async with engine.connect() as conn:
+            rows = await conn.execute(ConversationCreate.__table__.select())
+            return {row.id: row.total_tokens for row in rows}
+
+    async def run():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+            await conn.execute(User.__table__.insert().values(id="u", user_name="u", hashed_password="x"))
+            await conn.execute(ConversationCreate.__table__.insert(), [
+                {"id": cid, "user_id": "u", "agent_id": "a", "title": "t", "total_tokens": 0,
+                 "created_at": datetime(2025, 1, 1)} for cid in ("c1", "c2")])
+        await scenario(stored)
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_increments_are_batched_into_one_write(tmp_path, monkeypatch):
+    async def scenario(stored):
+        ledger = TokenLedger()
+        for tokens in (10, 20, 5):
+            ledger.add("c1", tokens)
+        ledger.add("c2", 7)
+
+        assert await ledger.flush() == 2
+        assert await stored() == {"c1": 35, "c2": 7}
+        assert await ledger.flush() == 0
+
+    run_with_conversations(tmp_path, monkeypatch, scenario)
+
+
+def test_stop_flushes_what_is_left(tmp_path, monkeypatch):
+    async def scenario(stored):
+        ledger = TokenLedger(flush_interval=60)
+        ledger.start()
+        ledger.add("c1", 42)
+        await ledger.stop()
+
+        assert await stored() == {"c1": 42, "c2": 0}
+
+    run_with_conversations(tmp_path, monkeypatch, scenario)
+
+
+def test_failed_write_is_retried_and_still_counted(tmp_path, monkeypatch):
+    async def scenario(stored):
+        engine = token_ledger.async_engine
+        ledger = TokenLedger()
+        ledger.add("c1", 10)
+
+        class Down:
+            def begin(self):
+                raise ConnectionError("database down")
+
+        monkeypatch.setattr(token_ledger, "async_engine", Down())
+        assert await ledger.flush() == 0
+        assert ledger.pending("c1") == 10
+
+        monkeypatch.setattr(token_ledger, "async_engine", engine)
+        ledger.add("c1", 5)
+        assert await ledger.flush() == 1
+        assert await stored() == {"c1": 15, "c2": 0}
+
+    run_with_conversations(tmp_path, monkeypatch, scenario)
+
+
+def test_batch_in_flight_is_counted_and_kept_when_cancelled(tmp_path, monkeypatch):
+    async def scenario(stored):
+        writing = asyncio.Event()
+
+        class Slow:
+            def begin(self):
+                return self
+
+            async def __aenter__(self):
+                writing.set()
+                await asyncio.sleep(10)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        monkeypatch.setattr(token_ledger, "async_engine", Slow())
+        ledger = TokenLedger()
+        ledger.add("c1", 10)
+        flush = asyncio.create_task(ledger.flush())
+        await writing.wait()
+
+        assert ledger.pending("c1") == 10
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+        assert ledger.pending("c1") == 10
+
+    run_with_conversations(tmp_path, monkeypatch, scenario)
@@ -0,0 +1,67 @@
+import asyncio, os
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("GROQ_API_KEY", "test")
+from langchain_core.tools import tool
+import graph_registry, tool_catalog
+from tool_catalog import ToolCatalog
+
+
+@tool
+def search_pubmed(term: str) -> str:
+    """Search PubMed."""
+    return term
+
+
+class Agent:
+    id, creativity, context_turns, context_summary = "a1", 0.1, 8, True
+    retrieval_mode, relevance_grading, model_routing = "llm", False, {}
+
+
+def test_a_cold_start_without_tools_is_retried(monkeypatch):
+    monkeypatch.setattr(tool_catalog, "TOOL_CATALOG_RETRY_SECONDS", 0)
+    responses = [[], [search_pubmed]]
+
+    async def loader():
+        return responses.pop(0)
+
+    catalog = ToolCatalog(loader)
+
+    async def run():
+        assert await catalog.get() == []
+        assert catalog.refreshed_at is None
+        return await catalog.get()
+
+    assert [t.name for t in asyncio.run(run())] == ["search_pubmed"]
+    assert catalog.version == 1
+
+
+def test_retries_back_off_until_the_first_tools(monkeypatch):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return []
+
+    catalog = ToolCatalog(loader)
+
+    async def run():
+        for _ in range(3):
+            await catalog.get()
+
+    asyncio.run(run())
+    assert len(calls) == 1
+
+
+def test_a_graph_built_without_tools_is_not_cached(monkeypatch):
+    async def create_graph(checkpointer, *args, **kwargs):
+        return type("Graph", (), {"checkpointer": checkpointer})()
+
+    async def no_tools():
+        return []
+
+    monkeypatch.setattr(graph_registry, "create_graph", create_graph)
+    monkeypatch.setattr(graph_registry.tool_catalog, "get", no_tools)
+
+    asyncio.run(graph_registry.get_graph(None, Agent()))
+
+    assert not [key for key in graph_registry._graphs if key[0] == "a1"]
@@ -0,0 +1,160 @@
+import asyncio
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+import tool_executor
+from tool_executor import concurrent_tool_node, run_tool_call, tool_call_stats
+
+upstream_calls = []
+
+
+@tool
+async def search(term: str) -> str:
+    """Search the literature."""
+    upstream_calls.append(term)
+    await asyncio.sleep(0.05)
+    return f"results for {term}"
+
+
+def test_identical_concurrent_calls_share_one_request():
+    tools_by_name = {"search": search}
+    calls = [{"name": "search", "args": {"term": "asthma"}, "id": f"call_{i}"} for i in range(4)]
+    calls.append({"name": "search", "args": {"term": "flu"}, "id": "call_flu"})
+    coalesced = tool_call_stats["coalesced"]
+
+    async def run():
+        return await asyncio.gather(*(run_tool_call(tools_by_name, call) for call in calls))
+
+    messages = asyncio.run(run())
+
+    assert sorted(upstream_calls) == ["asthma", "flu"]
+    assert tool_call_stats["coalesced"] - coalesced == 3
+    assert [m.tool_call_id for m in messages] == [call["id"] for call in calls]
+    assert messages[0].content == messages[3].content == "results for asthma"
+
+
+def test_a_caller_giving_up_does_not_cancel_the_shared_call():
+    tools_by_name = {"search": search}
+    first = {"name": "search", "args": {"term": "measles"}, "id": "call_first"}
+    second = {**first, "id": "call_second"}
+
+    async def run():
+        impatient = asyncio.create_task(run_tool_call(tools_by_name, first))
+        waiting = asyncio.create_task(run_tool_call(tools_by_name, second))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        return await waiting
+
+    message = asyncio.run(run())
+
+    assert message.content == "results for measles" and message.tool_call_id == "call_second"
+    assert upstream_calls.count("measles") == 1
+
+
+def test_a_call_abandoned_by_every_caller_is_not_joined():
+    tools_by_name = {"search": search}
+    call = {"name": "search", "args": {"term": "mumps"}, "id": "call_1"}
+
+    async def run():
+        abandoned = asyncio.create_task(run_tool_call(tools_by_name, call))
+        await asyncio.sleep(0.01)
+        abandoned.cancel()
+        # joins before the cancelled request has finished unwinding
+        late = asyncio.create_task(run_tool_call(tools_by_name, {**call, "id": "call_2"}))
+        await asyncio.gather(abandoned, return_exceptions=True)
+        return await late
+
+    message = asyncio.run(run())
+
+    assert message.content == "results for mumps" and message.status != "error"
+    assert upstream_calls.count("mumps") == 2
+
+
+@tool
+async def hang(term: str) -> str:
+    """Never answers in time."""
+    await asyncio.sleep(10)
+    return term
+
+
+@tool
+async def broken(term: str) -> str:
+    """Always fails."""
+    raise RuntimeError("upstream returned 500")
+
+
+def test_a_slow_call_times_out_into_an_error_message():
+    timeouts = tool_call_stats["timeouts"]
+    call = {"name": "hang", "args": {"term": "asthma"}, "id": "call_1"}
+
+    message = asyncio.run(run_tool_call({"hang": hang}, call, timeout=0.05))
+
+    assert message.status == "error" and message.tool_call_id == "call_1"
+    assert "did not answer within 0.05 seconds" in message.content
+    assert tool_call_stats["timeouts"] - timeouts == 1
+
+
+def test_unknown_and_failing_tools_become_error_messages():
+    errors = tool_call_stats["errors"]
+    tools_by_name = {"broken": broken}
+
+    async def run():
+        return await asyncio.gather(
+            run_tool_call(tools_by_name, {"name": "missing", "args": {}, "id": "call_1"}),
+            run_tool_call(tools_by_name, {"name": "broken", "args": {"term": "flu"}, "id": "call_2"}))
+
+    missing, failed = asyncio.run(run())
+
+    assert missing.status == failed.status == "error"
+    assert "missing is not a valid tool" in missing.content
+    assert "upstream returned 500" in failed.content
+    assert tool_call_stats["errors"] - errors == 2
+
+
+def test_the_node_keeps_the_results_of_the_tools_that_answered():
+    node = concurrent_tool_node([search, hang], timeout=0.2)
+    calls = [{"name": "hang", "args": {"term": "covid"}, "id": "call_hang"},
+             {"name": "search", "args": {"term": "covid"}, "id": "call_search"}]
+
+    update = asyncio.run(node({"messages": [AIMessage("", tool_calls=calls)]}))
+
+    hung, answered = update["messages"]
+    assert hung.status == "error" and hung.tool_call_id == "call_hang"
+    assert answered.content == "results for covid" and answered.tool_call_id == "call_search"
+
+
+def test_the_inflight_cap_limits_concurrent_calls(monkeypatch):
+    monkeypatch.setattr(tool_executor, "MAX_INFLIGHT_TOOL_CALLS", 2)
+    running, peak = 0, 0
+
+    @tool
+    async def count(term: str) -> str:
+        """Tracks how many calls run at once."""
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return term
+
+    calls = [{"name": "count", "args": {"term": str(i)}, "id": f"call_{i}"} for i in range(6)]
+
+    async def run():
+        return await asyncio.gather(*(run_tool_call({"count": count}, call) for call in calls))
+
+    messages = asyncio.run(run())
+
+    assert [m.content for m in messages] == [str(i) for i in range(6)]
+    assert peak == 2
+
+
+def test_the_inflight_cap_works_across_event_loops(monkeypatch):
+    monkeypatch.setattr(tool_executor, "MAX_INFLIGHT_TOOL_CALLS", 1)
+    monkeypatch.setattr(tool_executor, "_inflight", None)
+    calls = [{"name": "search", "args": {"term": f"loop {i}"}, "id": f"call_{i}"} for i in range(2)]
+
+    async def run():
+        return await asyncio.gather(*(run_tool_call({"search": search}, call) for call in calls))
+
+    # the first loop leaves waiters on its semaphore, the second must not reuse it
+    for _ in range(2):
+        assert all(m.status != "error" for m in asyncio.run(run()))
@@ -0,0 +1,104 @@
+import asyncio, os
+from collections import defaultdict
+from dotenv import load_dotenv
+from sqlalchemy import bindparam, update
+from persistDB import async_engine
+from sql_models import ConversationCreate
+
+load_dotenv()
+
+TOKEN_LEDGER_FLUSH_SECONDS = float(os.getenv("TOKEN_LEDGER_FLUSH_SECONDS", "2"))
+
+_conversations = ConversationCreate.__table__
+
+# one statement, executed for the whole batch of pending deltas
+ADD_TOKENS = (
+    update(_conversations)
+    .where(_conversations.c.id == bindparam("conversation_id"))
+    .values(total_tokens=_conversations.c.total_tokens + bindparam("delta"))
+)
+
+
+class TokenLedger:
+    """Buffers token usage per conversation and writes it behind the response.
+
+    Increments are summed in memory and flushed every ``flush_interval``
+    seconds (and at shutdown) as atomic ``total_tokens = total_tokens + x``
+    updates, so concurrent turns of the same conversation never lose counts.
+    A batch whose write fails or is interrupted goes back to the buffer.
+    """
+
+    def __init__(self, flush_interval: float = TOKEN_LEDGER_FLUSH_SECONDS):
+        self.flush_interval = flush_interval
+        self._pending = defaultdict(int)
+        # the batch being written, still counted by total() until it is stored
+        self._in_flight = {}
+        self._flush_lock = asyncio.Lock()
+        self._stopping = None
+        self._task = None
+        self.flushed_rows = 0
+
+    def add(self, conversation_id: str, tokens: int):
+        if tokens:
+            self._pending[conversation_id] += tokens
+
+    def pending(self, conversation_id: str) -> int:
+        return self._pending.get(conversation_id, 0) + self._in_flight.get(conversation_id, 0)
+
+    def total(self, convo) -> int:
+        """Stored total plus what hasn't been flushed yet."""
+        return convo.total_tokens + self.pending(convo.id)
+
+    def discard(self, conversation_id: str):
+        self._pending.pop(conversation_id, None)
+        self._in_flight.pop(conversation_id, None)
+
+    def _restore(self):
+        for conversation_id, delta in self._in_flight.items():
+            self._pending[conversation_id] += delta
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            self._in_flight, self._pending = self._pending, defaultdict(int)
+            try:
+                params = [{"conversation_id": conversation_id, "delta": delta}
+                          for conversation_id, delta in self._in_flight.items()]
+                async with async_engine.begin() as conn:
+                    await conn.execute(ADD_TOKENS, params)
+            except Exception as e:
+                # put the deltas back, the next flush retries them
+                self._restore()
+                print(f"⚠️ Token usage flush failed: {e}")
+                return 0
+            except BaseException:
+                # cancelled mid-write: the transaction rolled back, keep the deltas
+                self._restore()
+                raise
+            finally:
+                self._in_flight = {}
+            self.flushed_rows += len(params)
+            return len(params)
+
+    async def _flush_loop(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                await self.flush()
+
+    def start(self):
+        # created here, the event belongs to the running loop
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Let the loop finish its write, then flush what is left."""
+        if self._task:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+token_ledger = TokenLedger()
@@ -0,0 +1,111 @@
+import asyncio, hashlib, json, os, time
+from dotenv import load_dotenv
+from test_mcp_1 import load_tools
+
+load_dotenv()
+
+TOOL_CATALOG_REFRESH_SECONDS = float(os.getenv("TOOL_CATALOG_REFRESH_SECONDS", "300"))
+# until the first tools arrive (e.g. MCP servers still starting), retry this often
+TOOL_CATALOG_RETRY_SECONDS = float(os.getenv("TOOL_CATALOG_RETRY_SECONDS", "5"))
+
+
+class ToolCatalog:
+    """In-process cache of the MCP tools, refreshed in the background.
+
+    A failed refresh (the loader returns no tools) keeps the last good catalog.
+    ``version`` only changes when the tool set itself changes, subscribers are
+    told about it so they can drop anything built from the old tools.
+    """
+
+    def __init__(self, loader, refresh_interval: float = TOOL_CATALOG_REFRESH_SECONDS):
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.tools = []
+        self.version = 0
+        self.fingerprint = None
+        self.refreshed_at = None
+        self._retry_at = 0.0
+        self.last_error = None
+        self._subscribers = []
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    async def get(self):
+        # only the calls before the first tools arrived wait for the MCP servers
+        if self.refreshed_at is None and time.time() >= self._retry_at:
+            await self.refresh()
+        return self.tools
+
+    async def refresh(self):
+        async with self._lock:
+            tools = await self.loader()
+
+            if not tools:
+                self.last_error = "MCP servers returned no tools, keeping the last good catalog."
+                print(f"⚠️ {self.last_error}")
+                if not self.tools:
+                    # never loaded, the next lookup retries after a short backoff
+                    self._retry_at = time.time() + TOOL_CATALOG_RETRY_SECONDS
+                else:
+                    self.refreshed_at = time.time()
+                return self.tools
+
+            self.refreshed_at = time.time()
+
+            self.last_error = None
+            fingerprint = _fingerprint(tools)
+            if fingerprint != self.fingerprint:
+                self.tools = tools
+                self.fingerprint = fingerprint
+                self.version += 1
+                print(f"🔧 Tool catalog v{self.version}: {[t.name for t in tools]}")
+                for callback in self._subscribers:
+                    callback()
+            return self.tools
+
+    async def invalidate(self):
+        """Force a refresh now instead of waiting for the next interval."""
+        return await self.refresh()
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval if self.tools else TOOL_CATALOG_RETRY_SECONDS)
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"⚠️ Tool catalog refresh failed: {e}")
+
+    async def start(self):
+        await self.refresh()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self):
+        return {
+            "version": self.version,
+            "tools": [t.name for t in self.tools],
+            "refreshed_at": self.refreshed_at,
+            "refresh_interval": self.refresh_interval,
+            "last_error": self.last_error,
+        }
+
+
+def _fingerprint(tools):
+    spec = sorted((t.name, t.description or "", json.dumps(t.args, sort_keys=True, default=str))
+                  for t in tools)
+    return hashlib.sha256(json.dumps(spec).encode()).hexdigest()
+
+
+tool_catalog = ToolCatalog(load_tools)
@@ -0,0 +1,103 @@
+import asyncio, json, os
+from dotenv import load_dotenv
+from langchain_core.messages import ToolMessage
+
+load_dotenv()
+
+# deadline for one tool call, including the wait for a free in-flight slot
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "20"))
+# process-wide cap on tool calls running at the same time
+MAX_INFLIGHT_TOOL_CALLS = int(os.getenv("MAX_INFLIGHT_TOOL_CALLS", "32"))
+
+# created in the running loop, a semaphore is bound to the loop it first waited in
+_inflight = None
+_inflight_loop = None
+
+tool_call_stats = {"calls": 0, "timeouts": 0, "errors": 0, "coalesced": 0}
+
+# identical calls in flight, (name, args) -> [task, number of callers waiting]
+_shared_calls = {}
+
+
+def _inflight_slots() -> asyncio.Semaphore:
+    global _inflight, _inflight_loop
+    loop = asyncio.get_running_loop()
+    if _inflight_loop is not loop:
+        _inflight, _inflight_loop = asyncio.Semaphore(MAX_INFLIGHT_TOOL_CALLS), loop
+    return _inflight
+
+
+async def _limited_invoke(tool, call):
+    async with _inflight_slots():
+        return await tool.ainvoke({**call, "type": "tool_call"})
+
+
+def call_key(call: dict) -> tuple:
+    return call["name"], json.dumps(call["args"], sort_keys=True, default=str)
+
+
+def _forget_shared(key: tuple, shared: list):
+    if _shared_calls.get(key) is shared:
+        del _shared_calls[key]
+
+
+async def _coalesced_invoke(tool, call):
+    """Single flight: concurrent identical calls share one upstream request,
+    every caller gets the result under its own tool_call_id."""
+    key = call_key(call)
+    shared = _shared_calls.get(key)
+    if shared is None:
+        task = asyncio.create_task(_limited_invoke(tool, call))
+        shared = _shared_calls[key] = [task, 0]
+        task.add_done_callback(lambda _: _forget_shared(key, shared))
+    else:
+        tool_call_stats["coalesced"] += 1
+
+    task = shared[0]
+    shared[1] += 1
+    try:
+        # a caller giving up (timeout, cancelled turn) must not cancel the others' request
+        message = await asyncio.shield(task)
+    finally:
+        shared[1] -= 1
+        # the last caller gave up, nobody needs the result
+        if shared[1] == 0 and not task.done():
+            # a caller arriving before the cancellation lands starts its own request
+            _forget_shared(key, shared)
+            task.cancel()
+    return message.model_copy(update={"tool_call_id": call["id"]})
+
+
+async def run_tool_call(tools_by_name: dict, call: dict, timeout: float = TOOL_CALL_TIMEOUT) -> ToolMessage:
+    """Run one tool call, a timeout or failure becomes an error ToolMessage
+    so the other results of the turn are still used."""
+    tool_call_stats["calls"] += 1
+    tool = tools_by_name.get(call["name"])
+    if tool is None:
+        tool_call_stats["errors"] += 1
+        return ToolMessage(content=f"Error: {call['name']} is not a valid tool.",
+                           name=call["name"], tool_call_id=call["id"], status="error")
+    try:
+        return await asyncio.wait_for(_coalesced_invoke(tool, call), timeout)
+    except asyncio.TimeoutError:
+        tool_call_stats["timeouts"] += 1
+        print(f"⏱️ Tool '{call['name']}' timed out after {timeout}s.")
+        return ToolMessage(content=f"No results: {call['name']} did not answer within {timeout:g} seconds.",
+                           name=call["name"], tool_call_id=call["id"], status="error")
+    except Exception as e:
+        tool_call_stats["errors"] += 1
+        return ToolMessage(content=f"Error: {call['name']} failed ({e}).",
+                           name=call["name"], tool_call_id=call["id"], status="error")
+
+
+def concurrent_tool_node(tools, timeout: float = TOOL_CALL_TIMEOUT):
+    """Graph node running every tool call of the last AIMessage concurrently."""
+    tools_by_name = {tool.name: tool for tool in tools}
+
+    async def run_tools(state):
+        tool_calls = state["messages"][-1].tool_calls
+        results = await asyncio.gather(*(run_tool_call(tools_by_name, call, timeout)
+                                         for call in tool_calls))
+        return {"messages": list(results)}
+
+    return run_tools